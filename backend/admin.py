@@ -1,32 +1,30 @@
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, Response, request, jsonify, g, stream_with_context
+import csv
+import io
 from bson.objectid import ObjectId
-import jwt
 from flasgger import swag_from
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+from body_parts import init_body_parts
+from export_lines import MIMETYPES, encode
+
+MAX_BULK_EXERCISES = 10000
+EXPORT_BATCH_SIZE = 500
+EXERCISE_FIELDS = ['name', 'youtube_link', 'bodyPart', 'description']
 
 admin_bp = Blueprint('admin', __name__)
 
 def init_admin_routes(app, mongo):
     exercises_collection = mongo.db.exercises
-    body_parts_collection = mongo.db.bodyParts
+    body_parts = init_body_parts(app, mongo)
     sessions_collection = mongo.db.sessions
     users_collection = mongo.db.users
+    catalog = app.extensions.get('exercise_catalog')
+    search = app.extensions.get('exercise_search')
 
-    @admin_bp.before_request
-    def authenticate_admin():
-        token = request.headers.get('Authorization')
-        if not token or not token.startswith('Bearer '):
-            return jsonify({"error": "Bearer token is missing"}), 401
-        token = token.split('Bearer ')[1]
-        try:
-            payload = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-            session = sessions_collection.find_one({'username': payload['username'], 'tokens': token})
-            if not session or payload.get('hasRole') != 'admin':
-                return jsonify({"error": "Unauthorized access"}), 401
-            g.user = payload
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token has expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
+    def catalog_changed():
+        if catalog:
+            catalog.invalidate()
 
     @admin_bp.route('/exercises', methods=['POST'])
     @swag_from({
@@ -74,7 +72,7 @@ def init_admin_routes(app, mongo):
         if not all(field in data for field in required_fields):
             return jsonify({"error": "Missing required fields"}), 400
 
-        body_part_document = body_parts_collection.find_one({'name': data['bodyPart']})
+        body_part_document = body_parts.resolve(data['bodyPart'])
         if not body_part_document:
             return jsonify({"error": "Body part not found"}), 404
 
@@ -86,8 +84,181 @@ def init_admin_routes(app, mongo):
         }
 
         result = exercises_collection.insert_one(exercise)
+        catalog_changed()
+        if search:
+            search.add(exercise)
         return jsonify({"message": "Exercise added successfully"}), 201
     
+    @admin_bp.route('/exercises/bulk', methods=['POST'])
+    @swag_from({
+        "tags": ["Admin"],
+        "summary": "Add many exercises",
+        "description": "Import up to 10000 exercises as JSON ({\"exercises\": [...]}) or as CSV (Content-Type: text/csv) "
+                       "with a header row of name, youtube_link, bodyPart, description. "
+                       "Valid rows are written even if others fail.",
+        "security": [{"Bearer": []}],
+        "consumes": ["application/json", "text/csv"],
+        "parameters": [
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "exercises": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "name": {"type": "string"},
+                                    "youtube_link": {"type": "string"},
+                                    "bodyPart": {"type": "string"},
+                                    "description": {"type": "string"}
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        ],
+        "responses": {
+            "200": {
+                "description": "Per-row results, in input order.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "inserted": {"type": "integer"},
+                        "results": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "row": {"type": "integer"},
+                                    "status": {"type": "string", "enum": ["ok", "error"]},
+                                    "id": {"type": "string"},
+                                    "error": {"type": "string"}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            "400": {"description": "Exercises are missing, malformed, or more than 10000 were sent"},
+            "401": {"description": "Unauthorized access or invalid token"}
+        }
+    })
+    def add_exercises_bulk():
+        if not hasattr(g, 'user'):
+            return jsonify({"error": "Unauthorized access"}), 401
+
+        if request.mimetype == 'text/csv':
+            try:
+                rows = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+            except csv.Error:
+                return jsonify({"error": "Invalid CSV"}), 400
+        else:
+            data = request.get_json(silent=True)
+            rows = data.get('exercises') if isinstance(data, dict) else None
+
+        if not isinstance(rows, list) or not rows:
+            return jsonify({"error": "Exercises are required"}), 400
+
+        if len(rows) > MAX_BULK_EXERCISES:
+            return jsonify({"error": f"At most {MAX_BULK_EXERCISES} exercises are allowed per import"}), 400
+
+        results = []
+        for index, row in enumerate(rows):
+            results.append({'row': index, 'status': 'ok'})
+            if not isinstance(row, dict) or not all(isinstance(row.get(field), str) and row[field].strip() for field in EXERCISE_FIELDS):
+                results[index].update(status='error', error="Missing required fields")
+
+        body_part_names = {row['bodyPart'] for row, result in zip(rows, results) if result['status'] == 'ok'}
+        resolved = body_parts.resolve_many(body_part_names)
+
+        exercises, row_of_operation = [], []
+        for index, row in enumerate(rows):
+            if results[index]['status'] != 'ok':
+                continue
+            body_part_document = resolved[row['bodyPart']]
+            if not body_part_document:
+                results[index].update(status='error', error="Body part not found")
+                continue
+            exercises.append({
+                "_id": ObjectId(),
+                "name": row['name'],
+                "youtube_link": row['youtube_link'],
+                "bodyPart_ref": str(body_part_document['_id']),
+                "description": row['description']
+            })
+            row_of_operation.append(index)
+
+        if exercises:
+            try:
+                exercises_collection.bulk_write([InsertOne(exercise) for exercise in exercises], ordered=False)
+            except BulkWriteError as e:
+                for error in e.details['writeErrors']:
+                    results[row_of_operation[error['index']]].update(status='error', error=error['errmsg'])
+            finally:
+                # Any other failure may still have written some rows, so both caches are refreshed either way
+                catalog_changed()
+                if search:
+                    search.invalidate()
+
+            for exercise, index in zip(exercises, row_of_operation):
+                if results[index]['status'] == 'ok':
+                    results[index]['id'] = str(exercise['_id'])
+                    if search:
+                        search.add(exercise)
+
+        inserted = sum(1 for result in results if result['status'] == 'ok')
+        return jsonify({"inserted": inserted, "results": results}), 200
+
+    @admin_bp.route('/exercises/export', methods=['GET'])
+    @swag_from({
+        "tags": ["Admin"],
+        "summary": "Export all exercises",
+        "description": "Stream every exercise with the same fields the bulk import accepts, so an export can be imported again.",
+        "security": [{"Bearer": []}],
+        "produces": ["application/x-ndjson", "text/csv"],
+        "parameters": [
+            {"name": "format", "in": "query", "type": "string", "enum": ["ndjson", "csv"], "required": False, "description": "Output format (default ndjson)"}
+        ],
+        "responses": {
+            "200": {"description": "One exercise per line"},
+            "400": {"description": "Unsupported format"},
+            "401": {"description": "Unauthorized access or invalid token"}
+        }
+    })
+    def export_exercises():
+        if not hasattr(g, 'user'):
+            return jsonify({"error": "Unauthorized access"}), 401
+
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in MIMETYPES:
+            return jsonify({"error": "Format must be csv or ndjson"}), 400
+
+        def rows():
+            names = body_parts.names_by_id()
+            cursor = exercises_collection.find({}, {'_id': 0, 'name': 1, 'youtube_link': 1, 'bodyPart_ref': 1, 'description': 1}).batch_size(EXPORT_BATCH_SIZE)
+            try:
+                for exercise in cursor:
+                    body_part_ref = str(exercise.get('bodyPart_ref'))
+                    if body_part_ref not in names:
+                        names[body_part_ref] = body_parts.name_of(body_part_ref) or ''
+                    yield {
+                        'name': exercise.get('name'),
+                        'youtube_link': exercise.get('youtube_link'),
+                        'bodyPart': names[body_part_ref],
+                        'description': exercise.get('description')
+                    }
+            finally:
+                cursor.close()
+
+        response = Response(stream_with_context(encode(export_format, rows(), EXERCISE_FIELDS)), mimetype=MIMETYPES[export_format])
+        response.headers['Content-Disposition'] = f'attachment; filename=exercises.{export_format}'
+        return response
+
     @admin_bp.route('/exercises/<string:exercise_id>', methods=['DELETE'])
     @swag_from({
         "tags": ["Admin"],
@@ -115,6 +286,9 @@ def init_admin_routes(app, mongo):
         if result.deleted_count == 0:
             return jsonify({"error": "Exercise not found"}), 404
 
+        catalog_changed()
+        if search:
+            search.remove(exercise_id)
         return jsonify({"message": "Exercise deleted successfully"}), 200
     
     @admin_bp.route('/exercises/<string:exercise_id>', methods=['PUT'])
@@ -169,7 +343,7 @@ def init_admin_routes(app, mongo):
         if not all(field in data for field in required_fields):
             return jsonify({"error": "Missing required fields"}), 400
 
-        body_part_document = body_parts_collection.find_one({'name': data['bodyPart']})
+        body_part_document = body_parts.resolve(data['bodyPart'])
         if not body_part_document:
             return jsonify({"error": "Body part not found"}), 404
 
@@ -184,6 +358,9 @@ def init_admin_routes(app, mongo):
         if result.matched_count == 0:
             return jsonify({"error": "Exercise not found"}), 404
 
+        catalog_changed()
+        if search:
+            search.add(dict(update, _id=exercise_id))
         return jsonify({"message": "Exercise updated successfully"}), 200
     
     @admin_bp.route('/users', methods=['GET'])
@@ -247,14 +424,10 @@ def init_admin_routes(app, mongo):
         if not hasattr(g, 'user'):
             return jsonify({"error": "Unauthorized access"}), 401
         
-        active_sessions = sessions_collection.find({}, {'_id': 0, 'username': 1})
-        logged_in_users = []
-
-        for session in active_sessions:
-            user = users_collection.find_one({'username': session['username']}, {'_id': 1, 'username': 1, 'email': 1, 'hasRole': 1})
-            if user:
-                user['_id'] = str(user['_id'])  # Convert ObjectId to string
-                logged_in_users.append(user)
+        active_usernames = sessions_collection.distinct('username')
+        logged_in_users = list(users_collection.find({'username': {'$in': active_usernames}}, {'_id': 1, 'username': 1, 'email': 1, 'hasRole': 1}))
+        for user in logged_in_users:
+            user['_id'] = str(user['_id'])  # Convert ObjectId to string
 
         return jsonify(logged_in_users), 200
     
@@ -0,0 +1,117 @@
+from flask import request, jsonify, g
+from collections import OrderedDict
+from functools import wraps
+import threading
+import time
+import jwt
+from session_store import SessionStore
+
+# Every blueprint behind these prefixes needs a valid session; /admin also needs the admin role.
+PROTECTED_PREFIXES = ('/calories', '/workouts', '/progress', '/dashboard', '/admin', '/export')
+ADMIN_PREFIX = '/admin'
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens -> JWT payload.
+
+    Entries live for at most `ttl` seconds and never past the token's own `exp`,
+    so a revoked session is only trusted for the TTL in other worker processes.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return payload
+
+    def put(self, token, payload):
+        expires_at = min(time.time() + self.ttl, payload.get('exp', float('inf')))
+        with self._lock:
+            self._entries[token] = (payload, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+
+class Authenticator:
+    def __init__(self, app, mongo):
+        self.app = app
+        self.sessions = SessionStore(mongo.db.sessions)
+        self.cache = TokenCache(app.config['AUTH_CACHE_SIZE'], app.config['AUTH_CACHE_TTL'])
+
+    def authenticate(self):
+        """Verify the bearer token once per request and store its payload in `g.user`.
+
+        Returns an error response, or None when the request is authenticated.
+        """
+        if hasattr(g, 'user'):
+            return None
+
+        token = request.headers.get('Authorization')
+        if not token or not token.startswith('Bearer '):
+            return jsonify({"error": "Bearer token is missing"}), 401
+        token = token.split('Bearer ')[1]
+
+        payload = self.cache.get(token)
+        if payload is None:
+            try:
+                payload = jwt.decode(token, self.app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+            except jwt.ExpiredSignatureError:
+                return jsonify({"error": "Token has expired"}), 401
+            except jwt.InvalidTokenError:
+                return jsonify({"error": "Invalid token"}), 401
+
+            if not self.sessions.is_valid(token):
+                return jsonify({"error": "Invalid token"}), 401
+            self.cache.put(token, payload)
+
+        g.user = payload
+        g.token = token
+        return None
+
+    def before_request(self):
+        if not request.path.startswith(PROTECTED_PREFIXES):
+            return None
+
+        error = self.authenticate()
+        if error:
+            return error
+
+        if request.path.startswith(ADMIN_PREFIX) and g.user.get('hasRole') != 'admin':
+            return jsonify({"error": "Unauthorized access"}), 401
+
+    def token_required(self, f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            error = self.authenticate()
+            if error:
+                return error
+            return f(*args, **kwargs)
+        return decorated
+
+    def revoke(self, token):
+        self.cache.evict(token)
+        return self.sessions.revoke(token)
+
+
+def init_auth(app, mongo):
+    auth = Authenticator(app, mongo)
+    app.before_request(auth.before_request)
+    app.extensions['auth'] = auth
+    return auth
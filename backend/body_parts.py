@@ -0,0 +1,127 @@
+"""Body part name -> document resolution shared by the workouts and admin routes.
+
+Body parts almost never change, so every one of them is loaded at startup
+into a map keyed by lower-cased name. A name missing from the map is looked up
+once in Mongo; if it does not exist either, the miss is remembered for
+`negative_ttl` seconds so repeated requests for unknown names stay in memory.
+Call `invalidate()` after changing the bodyParts collection.
+"""
+import re
+import threading
+import time
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+MAX_REMEMBERED_MISSES = 10000
+
+
+def _key(name):
+    return name.strip().lower()
+
+
+class BodyPartResolver:
+    def __init__(self, collection, negative_ttl):
+        self.collection = collection
+        self.negative_ttl = negative_ttl
+        self._by_name = {}
+        self._missing = {}
+        self._lock = threading.Lock()
+
+    def warm(self):
+        by_name = {_key(document['name']): document for document in self.collection.find({}, {'name': 1})}
+        with self._lock:
+            self._by_name, self._missing = by_name, {}
+
+    def resolve(self, name):
+        """The body part document ({'_id', 'name'}) matching `name` in any case, or None."""
+        if not isinstance(name, str):
+            return None
+        key = _key(name)
+        with self._lock:
+            document = self._by_name.get(key)
+            if document is not None:
+                return document
+            if self._missing.get(key, 0) > time.time():
+                return None
+
+        document = self.collection.find_one({'name': {'$regex': f'^{re.escape(name.strip())}$', '$options': 'i'}}, {'name': 1})
+        with self._lock:
+            if document:
+                self._by_name[key] = document
+            else:
+                self._remember_miss(key)
+        return document
+
+    def _remember_miss(self, key):
+        if len(self._missing) >= MAX_REMEMBERED_MISSES:
+            now = time.time()
+            self._missing = {missing: expires_at for missing, expires_at in self._missing.items() if expires_at > now}
+            if len(self._missing) >= MAX_REMEMBERED_MISSES:
+                self._missing = {}
+        self._missing[key] = time.time() + self.negative_ttl
+
+    def resolve_many(self, names):
+        """Map each name to its body part document (None if unknown), with one query for all misses."""
+        resolved, lookup = {}, {}
+        now = time.time()
+        with self._lock:
+            for name in names:
+                if not isinstance(name, str):
+                    resolved[name] = None
+                    continue
+                key = _key(name)
+                if key in self._by_name:
+                    resolved[name] = self._by_name[key]
+                elif self._missing.get(key, 0) > now:
+                    resolved[name] = None
+                else:
+                    lookup.setdefault(key, []).append(name)
+
+        if lookup:
+            patterns = [re.compile(f'^{re.escape(key)}$', re.IGNORECASE) for key in lookup]
+            found = {_key(document['name']): document for document in self.collection.find({'name': {'$in': patterns}}, {'name': 1})}
+            with self._lock:
+                for key, key_names in lookup.items():
+                    document = found.get(key)
+                    if document:
+                        self._by_name[key] = document
+                    else:
+                        self._remember_miss(key)
+                    for name in key_names:
+                        resolved[name] = document
+        return resolved
+
+    def names_by_id(self):
+        """Snapshot of body part id (as stored in bodyPart_ref) -> name."""
+        with self._lock:
+            return {str(document['_id']): document['name'] for document in self._by_name.values()}
+
+    def name_of(self, body_part_id):
+        """Name of the body part with this id (as stored in bodyPart_ref), or None if there is none."""
+        with self._lock:
+            for document in self._by_name.values():
+                if str(document['_id']) == body_part_id:
+                    return document['name']
+
+        try:
+            document = self.collection.find_one({'_id': ObjectId(body_part_id)}, {'name': 1})
+        except InvalidId:
+            return None
+        if not document:
+            return None
+        with self._lock:
+            self._by_name[_key(document['name'])] = document
+        return document['name']
+
+    def invalidate(self):
+        """Reload every body part and forget remembered misses."""
+        self.warm()
+
+
+def init_body_parts(app, mongo):
+    """The app's shared resolver, created and warmed on first use."""
+    if 'body_parts' not in app.extensions:
+        resolver = BodyPartResolver(mongo.db.bodyParts, app.config['BODY_PART_NEGATIVE_TTL'])
+        resolver.warm()
+        app.extensions['body_parts'] = resolver
+    return app.extensions['body_parts']
@@ -1,44 +1,57 @@
-from flask import Flask, Blueprint, request, jsonify, g
+from flask import Flask, Blueprint, Response, request, jsonify, g, stream_with_context
 import datetime
-import jwt
+import json
 from config import Config
-from functools import wraps
+import dates
+from goal_periods import GoalPeriods, GoalPeriodLocked
+from pagination import parse_page_args, find_page
 from flasgger import swag_from
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 calories_bp = Blueprint('calories', __name__)
 
+MAX_BATCH_ENTRIES = 1000
+RANGE_BATCH_SIZE = 500
+
+# Response field -> goal document field, for GET /calories/progress
+GOAL_FIELDS = {
+    'goal': 'goal',
+    'calories_burned': 'calories_burned',
+    'activity': 'activity',
+    'start_date': 'start_date',
+    'end_date': 'end_date'
+}
+
 def init_calories_routes(app, mongo):
     users_collection = mongo.db.users
     calories_tracker_collection = mongo.db.calories_tracker
+    goal_periods = GoalPeriods(calories_tracker_collection, mongo.db.goal_locks, 'calories')
     daily_calories_log_collection = mongo.db.daily_calories_log
-
-    def auth_required(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            token = request.headers.get('Authorization')
-            if not token or not token.startswith('Bearer '):
-                return jsonify({"error": "Bearer token is missing"}), 401
-            token = token.split('Bearer ')[1]
-            try:
-                payload = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-                g.user = payload
-            except jwt.ExpiredSignatureError:
-                return jsonify({"error": "Token has expired"}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({"error": "Invalid token"}), 401
-            return f(*args, **kwargs)
-        return decorated_function
+    leaderboard = app.extensions.get('leaderboard')
+
+    def recount_calories(goal_ids):
+        """Set each goal's calories_burned to the sum of its daily_calories_log entries."""
+        goal_ids = list(goal_ids)
+        totals = {row['_id']: row['calories'] for row in daily_calories_log_collection.aggregate([
+            {'$match': {'goal_id': {'$in': goal_ids}}},
+            {'$group': {'_id': '$goal_id', 'calories': {'$sum': '$calories'}}}
+        ])}
+        calories_tracker_collection.bulk_write(
+            [UpdateOne({'_id': goal_id}, {'$set': {'calories_burned': totals.get(goal_id, 0)}}) for goal_id in goal_ids],
+            ordered=False
+        )
 
     @calories_bp.route('/goal', methods=['POST'])
-    @auth_required
     @swag_from({
         'tags': ['Calories Tracker'],
         'summary': 'Set a Goal',
         'responses': {
             201: {'description': 'Goal set successfully'},
+            409: {'description': 'Another goal is being set for the user at the same time'},
             400: {'description': 'All fields are required or Invalid username or A goal already exists for the specified period'},
             401: {'description': 'Bearer token is missing or Token has expired or Invalid token'}
         },
@@ -73,50 +86,39 @@ def init_calories_routes(app, mongo):
             return jsonify({"error": "Invalid username"}), 400
 
         try:
-            start_date_obj = datetime.datetime.strptime(start_date, '%d-%m-%Y')
-            end_date_obj = datetime.datetime.strptime(end_date, '%d-%m-%Y')
+            start_day = dates.parse_dmy(start_date)
+            end_day = dates.parse_dmy(end_date)
         except ValueError:
             return jsonify({"error": "Invalid date format. Use dd-mm-yyyy."}), 400
 
-        today = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        if start_date_obj < today:
+        if start_day < dates.from_date(datetime.datetime.utcnow()):
             return jsonify({"error": "Start date cannot be in the past"}), 400
 
-        if end_date_obj <= start_date_obj:
+        if end_day <= start_day:
             return jsonify({"error": "End date must be after the start date"}), 400
 
-        if (end_date_obj - start_date_obj).days != 6:
+        if end_day - start_day != 6:
             return jsonify({"error": "The goal period must be exactly 7 days"}), 400
 
-        start_date_str = start_date_obj.strftime('%Y-%m-%d')
-        end_date_str = end_date_obj.strftime('%Y-%m-%d')
-
-        overlapping_goal = calories_tracker_collection.find_one({
-            'username': username,
-            '$or': [
-                {'start_date': {'$lte': end_date_str, '$gte': start_date_str}},
-                {'end_date': {'$gte': start_date_str, '$lte': end_date_str}},
-                {'start_date': {'$lte': start_date_str}, 'end_date': {'$gte': end_date_str}}
-            ]
-        })
-
-        if overlapping_goal:
-            return jsonify({"error": "A goal already exists for the specified period"}), 400
-
         goal_data = {
             'username': username,
-            'start_date': start_date_str,
-            'end_date': end_date_str,
+            'start_date': start_day,
+            'end_date': end_day,
             'goal': goal,
             'activity': activity,
             'calories_burned': 0,
             'created_at': datetime.datetime.utcnow().strftime('%Y-%m-%d')
         }
-        calories_tracker_collection.insert_one(goal_data)
+        try:
+            with goal_periods.lock(username):
+                if goal_periods.find_overlap(username, start_day, end_day):
+                    return jsonify({"error": "A goal already exists for the specified period"}), 400
+                calories_tracker_collection.insert_one(goal_data)
+        except GoalPeriodLocked:
+            return jsonify({"error": "Another goal is being set, please try again"}), 409
         return jsonify({"message": "Goal set successfully"}), 201
 
     @calories_bp.route('', methods=['POST'])
-    @auth_required
     @swag_from({
         'tags': ['Calories Tracker'],
         'summary': 'Add Calories by date',
@@ -161,66 +163,216 @@ def init_calories_routes(app, mongo):
         if not date or not calories:
             return jsonify({"error": "All fields are required"}), 400
 
+        if not isinstance(calories, (int, float)) or isinstance(calories, bool):
+            return jsonify({"error": "Calories must be a number"}), 400
+
         username = g.user['username']
         user = users_collection.find_one({'username': username})
         if not user:
             return jsonify({"error": "Invalid username"}), 400
 
-        log_date = datetime.datetime.strptime(date, '%d-%m-%Y').strftime('%Y-%m-%d')
-        goal = calories_tracker_collection.find_one({'username': username, 'start_date': {'$lte': log_date}, 'end_date': {'$gte': log_date}})
+        try:
+            log_date = dates.parse_dmy(date)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use dd-mm-yyyy."}), 400
+
+        goal = calories_tracker_collection.find_one(
+            {'username': username, 'start_date': {'$lte': log_date}, 'end_date': {'$gte': log_date}},
+            {'_id': 1}
+        )
 
         if not goal:
             return jsonify({"error": "No active goal for this period"}), 400
 
-        # Check if there's already an entry for the date
-        existing_log = next((entry for entry in goal.get('calories_logs', []) if entry['date'] == log_date), None)
-
-        if existing_log:
-            new_calories_burned = goal['calories_burned'] - existing_log['calories'] + calories
-            calories_tracker_collection.update_one(
-                {'_id': goal['_id'], 'calories_logs.date': log_date},
-                {'$set': {'calories_logs.$.calories': calories}}
-            )
-        else:
-            new_calories_burned = goal['calories_burned'] + calories
-            new_log_entry = {'date': log_date, 'calories': calories}
-            calories_tracker_collection.update_one(
-                {'_id': goal['_id']},
-                {'$push': {'calories_logs': new_log_entry}}
-            )
-
-        # Update the total calories burned
-        calories_tracker_collection.update_one(
+        # Each write is atomic on its own document: the day upsert hands back the amount it
+        # replaced, so the goal total moves by the exact delta even under concurrent logs.
+        previous_log = daily_calories_log_collection.find_one_and_update(
+            {'username': username, 'date': log_date},
+            {'$set': {'calories': calories, 'goal_id': goal['_id']}},
+            projection={'calories': 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        delta = calories - (previous_log['calories'] if previous_log else 0)
+        if leaderboard:
+            leaderboard.add(username, log_date, delta)
+
+        goal = calories_tracker_collection.find_one_and_update(
             {'_id': goal['_id']},
-            {'$set': {'calories_burned': new_calories_burned}}
+            {'$inc': {'calories_burned': delta}},
+            projection={'goal': 1, 'calories_burned': 1},
+            return_document=ReturnDocument.AFTER
         )
 
         message = "Calories logged successfully"
-        if new_calories_burned >= goal['goal']:
+        if goal['calories_burned'] >= goal['goal']:
             message += " & The goal is achieved, Congratulations!"
 
         return jsonify({"message": message}), 200
 
+    @calories_bp.route('/batch', methods=['POST'])
+    @swag_from({
+        'tags': ['Calories Tracker'],
+        'summary': 'Add Calories for many dates',
+        'description': 'Log calories for up to 1000 dates in one request, e.g. from a wearable sync. Each entry follows the same rules as POST /calories.',
+        'parameters': [
+            {
+                'name': 'body',
+                'in': 'body',
+                'required': True,
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'entries': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'date': {'type': 'string', 'format': 'date', 'description': 'Date of the logged calories (dd-mm-yyyy)'},
+                                    'calories': {'type': 'number', 'description': 'Number of calories for the date'}
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        ],
+        'responses': {
+            200: {
+                'description': 'Per-entry results, in request order.',
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'logged': {'type': 'integer', 'description': 'Number of entries written'},
+                        'results': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'date': {'type': 'string'},
+                                    'status': {'type': 'string', 'enum': ['ok', 'skipped', 'error']},
+                                    'error': {'type': 'string'}
+                                }
+                            }
+                        }
+                    }
+                }
+            },
+            400: {'description': 'Entries are missing, not a list, or more than 1000 were sent.'},
+            401: {'description': 'Bearer token is missing or Token has expired or Invalid token.'}
+        },
+        'security': [{'Bearer': []}]
+    })
+    def log_calories_batch():
+        data = request.get_json()
+        entries = data.get('entries') if isinstance(data, dict) else None
+
+        if not isinstance(entries, list) or not entries:
+            return jsonify({"error": "Entries are required"}), 400
+
+        if len(entries) > MAX_BATCH_ENTRIES:
+            return jsonify({"error": f"At most {MAX_BATCH_ENTRIES} entries are allowed per batch"}), 400
+
+        username = g.user['username']
+        user = users_collection.find_one({'username': username})
+        if not user:
+            return jsonify({"error": "Invalid username"}), 400
+
+        results = []
+        parsed = {}
+        for index, entry in enumerate(entries):
+            date, calories = (entry.get('date'), entry.get('calories')) if isinstance(entry, dict) else (None, None)
+            results.append({'date': date, 'status': 'ok'})
+            if not date or not calories:
+                results[index].update(status='error', error="All fields are required")
+                continue
+            if not isinstance(calories, (int, float)) or isinstance(calories, bool):
+                results[index].update(status='error', error="Calories must be a number")
+                continue
+            try:
+                log_date = dates.parse_dmy(date)
+            except ValueError:
+                results[index].update(status='error', error="Invalid date format. Use dd-mm-yyyy.")
+                continue
+            # A later entry for the same date wins, as if the entries were posted one by one.
+            if log_date in parsed:
+                results[parsed[log_date][0]].update(status='skipped', error="Superseded by a later entry for the same date")
+            parsed[log_date] = (index, calories)
+
+        if parsed:
+            goals = list(calories_tracker_collection.find(
+                {'username': username, 'start_date': {'$lte': max(parsed)}, 'end_date': {'$gte': min(parsed)}},
+                {'start_date': 1, 'end_date': 1}
+            ))
+
+            # Only used to move the leaderboard, which is rebuilt from the log on a TTL anyway
+            previous = {
+                log['date']: log['calories']
+                for log in daily_calories_log_collection.find({'username': username, 'date': {'$in': list(parsed)}}, {'date': 1, 'calories': 1})
+            }
+
+            day_writes, written = [], []
+            for log_date, (index, calories) in parsed.items():
+                goal = next((goal for goal in goals if goal['start_date'] <= log_date <= goal['end_date']), None)
+                if not goal:
+                    results[index].update(status='error', error="No active goal for this period")
+                    continue
+                day_writes.append(UpdateOne(
+                    {'username': username, 'date': log_date},
+                    {'$set': {'calories': calories, 'goal_id': goal['_id']}},
+                    upsert=True
+                ))
+                written.append((log_date, index, calories, goal['_id']))
+
+            if day_writes:
+                try:
+                    daily_calories_log_collection.bulk_write(day_writes, ordered=False)
+                except BulkWriteError as e:
+                    for error in e.details['writeErrors']:
+                        results[written[error['index']][1]].update(status='error', error="Could not log calories for this date")
+                finally:
+                    # Recounting from the log, rather than adding deltas, keeps the totals exact under
+                    # concurrent logs and after a partial failure
+                    recount_calories({goal_id for _, _, _, goal_id in written})
+
+            if leaderboard:
+                for log_date, index, calories, _ in written:
+                    if results[index]['status'] == 'ok':
+                        leaderboard.add(username, log_date, calories - previous.get(log_date, 0))
+
+        logged = sum(1 for result in results if result['status'] == 'ok')
+        return jsonify({"logged": logged, "results": results}), 200
+
     @calories_bp.route('/progress', methods=['GET'])
-    @auth_required
     @swag_from({
         'tags': ['Calories Tracker'],
         'summary': 'Get Progress',
-        'description': 'Retrieve progress towards the calorie goal for all periods.',
+        'description': 'Retrieve progress towards the calorie goal for all periods, oldest first, one page at a time.',
+        'parameters': [
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False, 'description': 'Goals per page (1-200, default 50)'},
+            {'name': 'next', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Opaque token from the previous page'},
+            {'name': 'fields', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Comma-separated subset of goal, calories_burned, activity, start_date, end_date'}
+        ],
         'responses': {
             200: {
-                'description': 'Progress retrieved successfully. Returns progress details for all periods.',
+                'description': 'Progress retrieved successfully. Returns one page of progress details and the token for the next page.',
                 'schema': {
-                    'type': 'array',
-                    'items': {
-                        'type': 'object',
-                        'properties': {
-                            'goal': {'type': 'number', 'description': 'Target calorie goal for the period'},
-                            'calories_burned': {'type': 'number', 'description': 'Total calories burned for the period'},
-                            'activity': {'type': 'string', 'description': 'Description of the activity related to the goal'},
-                            'start_date': {'type': 'string', 'format': 'date', 'description': 'Start date of the period'},
-                            'end_date': {'type': 'string', 'format': 'date', 'description': 'End date of the period'}
-                        }
+                    'type': 'object',
+                    'properties': {
+                        'goals': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'goal': {'type': 'number', 'description': 'Target calorie goal for the period'},
+                                    'calories_burned': {'type': 'number', 'description': 'Total calories burned for the period'},
+                                    'activity': {'type': 'string', 'description': 'Description of the activity related to the goal'},
+                                    'start_date': {'type': 'string', 'format': 'date', 'description': 'Start date of the period'},
+                                    'end_date': {'type': 'string', 'format': 'date', 'description': 'End date of the period'}
+                                }
+                            }
+                        },
+                        'next': {'type': 'string', 'description': 'Pass as ?next= to fetch the following page; null on the last page'}
                     }
                 }
             },
@@ -239,25 +391,31 @@ def init_calories_routes(app, mongo):
         if not user:
             return jsonify({"error": "Invalid username"}), 400
 
-        goals = list(calories_tracker_collection.find({'username': username}))
+        try:
+            limit, after, fields = parse_page_args(request.args, GOAL_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        goals, next_token = find_page(
+            calories_tracker_collection,
+            {'username': username},
+            {GOAL_FIELDS[field]: 1 for field in fields},
+            limit,
+            after
+        )
 
-        if not goals:
+        if not goals and not after:
             return jsonify({"error": "No active goals found"}), 400
 
-        progress_list = [
-            {
-                'goal': goal['goal'],
-                'calories_burned': goal['calories_burned'],
-                'activity': goal['activity'],
-                'start_date': goal['start_date'],
-                'end_date': goal['end_date']
-            } for goal in goals
-        ]
+        def serialize(goal, field):
+            value = goal[GOAL_FIELDS[field]]
+            return dates.format_day(value) if field in ('start_date', 'end_date') else value
 
-        return jsonify(progress_list), 200
+        progress_list = [{field: serialize(goal, field) for field in fields} for goal in goals]
+
+        return jsonify({"goals": progress_list, "next": next_token}), 200
 
     @calories_bp.route('', methods=['GET'])
-    @auth_required
     @swag_from({
         'tags': ['Calories Tracker'],
         'summary': 'Get Calories by Date',
@@ -304,28 +462,70 @@ def init_calories_routes(app, mongo):
             return jsonify({"error": "Invalid username"}), 400
 
         try:
-            log_date = datetime.datetime.strptime(date, '%d-%m-%Y').strftime('%Y-%m-%d')
+            log_date = dates.parse_dmy(date)
         except ValueError:
             return jsonify({"error": "Invalid date format. Use dd-mm-yyyy."}), 400
 
-        goal = calories_tracker_collection.find_one({
-            'username': username,
-            'start_date': {'$lte': log_date},
-            'end_date': {'$gte': log_date}
-        })
-
-        if not goal:
-            return jsonify({"error": "No active goal for this period"}), 400
-
-        daily_log = next((entry for entry in goal.get('calories_logs', []) if entry['date'] == log_date), None)
+        daily_log = daily_calories_log_collection.find_one({'username': username, 'date': log_date}, {'calories': 1})
 
         if not daily_log:
+            goal = calories_tracker_collection.find_one({
+                'username': username,
+                'start_date': {'$lte': log_date},
+                'end_date': {'$gte': log_date}
+            }, {'_id': 1})
+            if not goal:
+                return jsonify({"error": "No active goal for this period"}), 400
             return jsonify({"error": "No calories logged for this date"}), 400
 
-        return jsonify({"date": log_date, "calories": daily_log['calories']}), 200
+        return jsonify({"date": dates.format_day(log_date), "calories": daily_log['calories']}), 200
     
+    @calories_bp.route('/range', methods=['GET'])
+    @swag_from({
+        'tags': ['Calories Tracker'],
+        'summary': 'Stream Calories for a date range',
+        'description': 'Stream every logged day between two dates, across goal boundaries, as newline-delimited JSON ordered by date.',
+        'produces': ['application/x-ndjson'],
+        'parameters': [
+            {'name': 'from', 'in': 'query', 'required': True, 'type': 'string', 'format': 'date', 'description': 'First date of the range (dd-mm-yyyy)'},
+            {'name': 'to', 'in': 'query', 'required': True, 'type': 'string', 'format': 'date', 'description': 'Last date of the range (dd-mm-yyyy)'}
+        ],
+        'responses': {
+            200: {'description': 'One {"date": ..., "calories": ...} object per line.'},
+            400: {'description': 'Bad request or invalid data provided.'},
+            401: {'description': 'Bearer token is missing or Token has expired or Invalid token.'}
+        },
+        'security': [{'Bearer': []}]
+    })
+    def get_calories_range():
+        start, end = request.args.get('from'), request.args.get('to')
+
+        if not start or not end:
+            return jsonify({"error": "From and To dates are required"}), 400
+
+        try:
+            start_day, end_day = dates.parse_dmy(start), dates.parse_dmy(end)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use dd-mm-yyyy."}), 400
+
+        if end_day < start_day:
+            return jsonify({"error": "To date must not be before From date"}), 400
+
+        cursor = daily_calories_log_collection.find(
+            {'username': g.user['username'], 'date': {'$gte': start_day, '$lte': end_day}},
+            {'_id': 0, 'date': 1, 'calories': 1}
+        ).sort('date', 1).batch_size(RANGE_BATCH_SIZE)
+
+        def generate():
+            try:
+                for log in cursor:
+                    yield json.dumps({'date': dates.format_day(log['date']), 'calories': log['calories']}) + '\n'
+            finally:
+                cursor.close()
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
     @calories_bp.route('', methods=['DELETE'])
-    @auth_required
     @swag_from({
         'tags': ['Calories Tracker'],
         'summary': 'Delete Calories by Date',
@@ -359,35 +559,36 @@ def init_calories_routes(app, mongo):
             return jsonify({"error": "Invalid username"}), 400
 
         try:
-            log_date = datetime.datetime.strptime(date, '%d-%m-%Y').strftime('%Y-%m-%d')
+            log_date = dates.parse_dmy(date)
         except ValueError:
             return jsonify({"error": "Invalid date format. Use dd-mm-yyyy."}), 400
 
-        goal = calories_tracker_collection.find_one({
-            'username': username,
-            'start_date': {'$lte': log_date},
-            'end_date': {'$gte': log_date}
-        })
-
-        if not goal:
-            return jsonify({"error": "No active goal for this period"}), 400
-
-        updated_logs = [entry for entry in goal.get('calories_logs', []) if entry['date'] != log_date]
+        # The delete itself decides "not found"; the goal is only looked up to word the error.
+        daily_log = daily_calories_log_collection.find_one_and_delete(
+            {'username': username, 'date': log_date},
+            projection={'calories': 1, 'goal_id': 1}
+        )
 
-        if len(updated_logs) == len(goal.get('calories_logs', [])):
+        if not daily_log:
+            goal = calories_tracker_collection.find_one({
+                'username': username,
+                'start_date': {'$lte': log_date},
+                'end_date': {'$gte': log_date}
+            }, {'_id': 1})
+            if not goal:
+                return jsonify({"error": "No active goal for this period"}), 400
             return jsonify({"error": "No calories logged for this date"}), 400
 
-        new_calories_burned = sum(entry['calories'] for entry in updated_logs)
-
         calories_tracker_collection.update_one(
-            {'_id': goal['_id']},
-            {'$set': {'calories_logs': updated_logs, 'calories_burned': new_calories_burned}}
+            {'_id': daily_log['goal_id']},
+            {'$inc': {'calories_burned': -daily_log['calories']}}
         )
+        if leaderboard:
+            leaderboard.add(username, log_date, -daily_log['calories'])
 
         return jsonify({"message": "Calories log deleted successfully"}), 200
 
     @calories_bp.route('/goals', methods=['DELETE'])
-    @auth_required
     @swag_from({
         'tags': ['Calories Tracker'],
         'summary': 'Delete goals',
@@ -430,21 +631,25 @@ def init_calories_routes(app, mongo):
             return jsonify({"error": "Invalid username"}), 400
 
         try:
-            start_date_str = datetime.datetime.strptime(start_date, '%d-%m-%Y').strftime('%Y-%m-%d')
-            end_date_str = datetime.datetime.strptime(end_date, '%d-%m-%Y').strftime('%Y-%m-%d')
+            start_day = dates.parse_dmy(start_date)
+            end_day = dates.parse_dmy(end_date)
         except ValueError:
             return jsonify({"error": "Invalid date format. Use dd-mm-yyyy."}), 400
 
         goal = calories_tracker_collection.find_one({
             'username': username,
-            'start_date': start_date_str,
-            'end_date': end_date_str
+            'start_date': start_day,
+            'end_date': end_day
         })
 
         if not goal:
             return jsonify({"error": "No goal found for this period"}), 400
 
         calories_tracker_collection.delete_one({'_id': goal['_id']})
+        if leaderboard:
+            for log in daily_calories_log_collection.find({'goal_id': goal['_id']}, {'date': 1, 'calories': 1}):
+                leaderboard.add(username, log['date'], -log['calories'])
+        daily_calories_log_collection.delete_many({'goal_id': goal['_id']})
 
         return jsonify({"message": "Goal deleted successfully"}), 200
     
@@ -452,7 +657,9 @@ def init_calories_routes(app, mongo):
 
 if __name__ == "__main__":
     from flask_pymongo import PyMongo
+    from auth import init_auth
     app.config["MONGO_URI"] = Config.MONGO_URI
     mongo = PyMongo(app)
+    init_auth(app, mongo)
     init_calories_routes(app, mongo)
     app.run(debug=True)
\ No newline at end of file
@@ -3,3 +3,24 @@ import os
 class Config:
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/fitness-tracking')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET', '123456.')
+    AUTH_CACHE_SIZE = int(os.getenv('AUTH_CACHE_SIZE', '10000'))
+    AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', '60'))
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+    PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', str(os.cpu_count() or 2)))
+    PASSWORD_POOL_QUEUE = int(os.getenv('PASSWORD_POOL_QUEUE', '32'))
+    PASSWORD_POOL_TIMEOUT = float(os.getenv('PASSWORD_POOL_TIMEOUT', '10'))
+    LOGIN_MAX_FAILURES = int(os.getenv('LOGIN_MAX_FAILURES', '5'))
+    LOGIN_MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', '50'))
+    LOGIN_FAILURE_WINDOW = int(os.getenv('LOGIN_FAILURE_WINDOW', '900'))
+    VERIFY_QUERY_PLANS = os.getenv('VERIFY_QUERY_PLANS', 'false').lower() == 'true'
+    PROGRESS_WRITE_BEHIND = os.getenv('PROGRESS_WRITE_BEHIND', 'false').lower() == 'true'
+    PROGRESS_FLUSH_SIZE = int(os.getenv('PROGRESS_FLUSH_SIZE', '500'))
+    PROGRESS_FLUSH_INTERVAL = float(os.getenv('PROGRESS_FLUSH_INTERVAL', '5'))
+    DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', '8'))
+    DASHBOARD_CACHE_SIZE = int(os.getenv('DASHBOARD_CACHE_SIZE', '10000'))
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '300'))
+    LEADERBOARD_WEEKS = int(os.getenv('LEADERBOARD_WEEKS', '12'))
+    LEADERBOARD_REBUILD_INTERVAL = int(os.getenv('LEADERBOARD_REBUILD_INTERVAL', '300'))
+    CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', '300'))
+    SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', '300'))
+    BODY_PART_NEGATIVE_TTL = int(os.getenv('BODY_PART_NEGATIVE_TTL', '60'))
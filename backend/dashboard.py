@@ -1,36 +1,71 @@
-from functools import wraps
 from flask import Blueprint, request, jsonify, current_app, g
-import jwt
 from flask_cors import CORS
 from flasgger import swag_from
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
-from datetime import datetime  # Correct import
+import dates
+import trends
+from leaderboard import week_of, week_start
+from goal_periods import GoalPeriods
+from user_cache import UserCache, invalidate_on_writes
+
+RECENT_ACTIVITY_DAYS = 7
+DEFAULT_LEADERBOARD_SIZE = 10
+MAX_LEADERBOARD_SIZE = 100
 
 dashboard_bp = Blueprint('dashboard', __name__)
 CORS(dashboard_bp)
 
 def init_dashboard_routes(app, mongo):
-    sessions_collection = mongo.db.sessions
     calories_tracker_collection = mongo.db.calories_tracker 
     progress_tracker_collection = mongo.db.progress_tracker
-
-    @app.before_request
-    def authenticate():
-        if request.path.startswith('/dashboard'):
-            token = request.headers.get('Authorization')
-            if not token or not token.startswith('Bearer '):
-                return jsonify({"error": "Bearer token is missing"}), 401
-            token = token.split('Bearer ')[1]
-            try:
-                payload = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-                g.user = payload
-                session = sessions_collection.find_one({'username': payload['username'], 'tokens': token})
-                if not session:
-                    return jsonify({"error": "Invalid token"}), 401
-            except jwt.ExpiredSignatureError:
-                return jsonify({"error": "Token has expired"}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({"error": "Invalid token"}), 401
+    daily_calories_log_collection = mongo.db.daily_calories_log
+    # The goal covering a day is the user's latest one starting on or before it, so each lookup is a one-document seek
+    calorie_periods = GoalPeriods(calories_tracker_collection, mongo.db.goal_locks, 'calories')
+    progress_periods = GoalPeriods(progress_tracker_collection, mongo.db.goal_locks, 'progress')
+    executor = ThreadPoolExecutor(max_workers=app.config['DASHBOARD_WORKERS'], thread_name_prefix='dashboard')
+    summary_cache = UserCache(app.config['DASHBOARD_CACHE_SIZE'], app.config['DASHBOARD_CACHE_TTL'])
+    trends_cache = UserCache(app.config['DASHBOARD_CACHE_SIZE'], app.config['DASHBOARD_CACHE_TTL'])
+    for cache in (summary_cache, trends_cache):
+        invalidate_on_writes(app, cache, ('/calories', '/progress'))
+        if 'progress_buffer' in app.extensions:
+            app.extensions['progress_buffer'].listeners.append(cache.invalidate_many)
+
+    def current_calorie_goal(username, day):
+        goal = calorie_periods.find_overlap(username, day, day, {'_id': 0, 'goal': 1, 'activity': 1, 'calories_burned': 1})
+        if not goal:
+            return None
+        return dict(goal, start_date=dates.format_day(goal['start_date']), end_date=dates.format_day(goal['end_date']))
+
+    def current_progress_goal(username, day):
+        goal = progress_periods.find_overlap(username, day, day, {'_id': 0, 'goal': 1, 'activity': 1, 'progress_total': 1})
+        if not goal:
+            return None
+        return {
+            'goal': goal.get('goal'),
+            'activity': goal.get('activity'),
+            'progress': goal.get('progress_total', 0),
+            'start_date': dates.format_day(goal['start_date']),
+            'end_date': dates.format_day(goal['end_date'])
+        }
+
+    def recent_activity(username, day):
+        logs = daily_calories_log_collection.find(
+            {'username': username, 'date': {'$gt': day - RECENT_ACTIVITY_DAYS, '$lte': day}},
+            {'_id': 0, 'date': 1, 'calories': 1}
+        ).sort('date', -1)
+        return [{'date': dates.format_day(log['date']), 'calories': log['calories']} for log in logs]
+
+    def build_summary(username):
+        day = dates.today()
+        calories = executor.submit(current_calorie_goal, username, day)
+        progress = executor.submit(current_progress_goal, username, day)
+        recent = executor.submit(recent_activity, username, day)
+        return {
+            'calories': calories.result(),
+            'progress': progress.result(),
+            'recent_activity': recent.result()
+        }
 
     @dashboard_bp.route('/calories', methods=['GET'])
     @swag_from({
@@ -59,21 +94,14 @@ def init_dashboard_routes(app, mongo):
             return jsonify({"error": "Unauthorized access"}), 401
 
         username = g.user['username']
-        current_date = datetime.now().date()
+        current_day = dates.today()
 
-        goals = list(calories_tracker_collection.find({'username': username}))
-        if not goals:
-            return jsonify({"error": "No active goals found"}), 400
-
-        current_week_goal = None
-        for goal in goals:
-            start_date = datetime.strptime(goal['start_date'], '%Y-%m-%d').date()
-            end_date = datetime.strptime(goal['end_date'], '%Y-%m-%d').date()
-            if start_date <= current_date <= end_date:
-                current_week_goal = goal
-                break
+        current_week_goal = calorie_periods.find_overlap(username, current_day, current_day, {'_id': 0, 'calories_burned': 1})
 
         if not current_week_goal:
+            # Only a miss needs to know whether the user has any goal at all
+            if not calories_tracker_collection.find_one({'username': username}, {'_id': 1}):
+                return jsonify({"error": "No active goals found"}), 400
             return jsonify({"error": "No goals set for this week ☹"}), 400
 
         calories_burned = current_week_goal['calories_burned']
@@ -96,25 +124,119 @@ def init_dashboard_routes(app, mongo):
             return jsonify({"error": "Unauthorized access"}), 401
 
         username = g.user['username']
-        current_date = datetime.now().date()
-
-        goals = progress_tracker_collection.find({'username': username})
+        current_day = dates.today()
 
-        if not goals:
-            return jsonify({"error": "No goals this week"}), 400
+        goal = progress_periods.find_overlap(username, current_day, current_day, {'_id': 0, 'progress_total': 1})
 
-        current_week_progress = None
-        for goal in goals:
-            start_date = datetime.strptime(goal['start_date'], '%Y-%m-%d').date()
-            end_date = datetime.strptime(goal['end_date'], '%Y-%m-%d').date()
-            if start_date <= current_date <= end_date:
-                total_progress = sum(entry['progress'] for entry in goal['progresses'])
-                current_week_progress = total_progress
-                break
-
-        if current_week_progress is None:
+        if not goal:
             return jsonify({"error": "No activity progress this week"}), 400
 
+        current_week_progress = goal.get('progress_total', 0)
+
         return jsonify({'progress': current_week_progress}), 200
 
+    def build_trends(username):
+        day = dates.today()
+        first_day = day - trends.WINDOW_DAYS + 1
+        window = {'$gte': first_day, '$lte': day}
+
+        logs = list(daily_calories_log_collection.find({'username': username, 'date': window}, {'_id': 0, 'date': 1, 'calories': 1}))
+        calories = trends.daily_series([log['date'] for log in logs], [log['calories'] for log in logs], day)
+
+        progress_days, progress_values = [], []
+        for goal in progress_tracker_collection.find(
+            {'username': username, 'start_date': {'$lte': day}, 'end_date': {'$gte': first_day}},
+            {'_id': 0, 'progresses': 1}
+        ):
+            for entry in goal.get('progresses', []):
+                progress_days.append(entry['date'])
+                progress_values.append(entry['progress'])
+        progress = trends.daily_series(progress_days, progress_values, day)
+
+        calorie_goal = calorie_periods.find_overlap(username, day, day, {'_id': 0, 'goal': 1, 'calories_burned': 1})
+        progress_goal = progress_periods.find_overlap(username, day, day, {'_id': 0, 'goal': 1, 'progress_total': 1})
+
+        return {
+            'window_days': trends.WINDOW_DAYS,
+            'calories': trends.summarize(calories, day, calorie_goal and {
+                'goal': calorie_goal['goal'], 'total': calorie_goal.get('calories_burned', 0), 'end_date': calorie_goal['end_date']
+            }),
+            'progress': trends.summarize(progress, day, progress_goal and {
+                'goal': progress_goal['goal'], 'total': progress_goal.get('progress_total', 0), 'end_date': progress_goal['end_date']
+            })
+        }
+
+    @dashboard_bp.route('/trends', methods=['GET'])
+    @swag_from({
+        'tags': ['Dashboard'],
+        'summary': 'Get calorie and progress trends',
+        'description': 'Over the last 365 days of calories and progress: 7 and 30-day rolling averages, current and longest streaks, '
+                       "this week against last week, and when the goal covering today will be reached at the 7-day average rate.",
+        'responses': {
+            200: {'description': 'Success'},
+            401: {'description': 'Bearer token is missing or Token has expired or Invalid token'}
+        },
+        'security': [{'Bearer': []}]
+    })
+    def get_trends():
+        username = g.user['username']
+        return jsonify(trends_cache.get_or_compute(username, lambda: build_trends(username))), 200
+
+    @dashboard_bp.route('/summary', methods=['GET'])
+    @swag_from({
+        'tags': ['Dashboard'],
+        'summary': 'Get the dashboard summary',
+        'description': "This week's calorie goal, progress goal and the calories logged over the last 7 days, in one response. "
+                       "A goal is null when none covers today.",
+        'responses': {
+            200: {'description': 'Success'},
+            401: {'description': 'Bearer token is missing or Token has expired or Invalid token'}
+        },
+        'security': [{'Bearer': []}]
+    })
+    def get_summary():
+        username = g.user['username']
+        # The lookups run in parallel; the result is reused until the user's next calorie or progress write
+        return jsonify(summary_cache.get_or_compute(username, lambda: build_summary(username))), 200
+
+    @dashboard_bp.route('/leaderboard', methods=['GET'])
+    @swag_from({
+        'tags': ['Dashboard'],
+        'summary': 'Get the weekly calories leaderboard',
+        'description': 'Top users by calories logged in a Monday-to-Sunday week, plus the caller\'s own rank. Users with equal totals share a rank.',
+        'parameters': [
+            {'name': 'week', 'in': 'query', 'type': 'string', 'format': 'date', 'required': False, 'description': 'Any date in the week (yyyy-mm-dd); defaults to this week'},
+            {'name': 'n', 'in': 'query', 'type': 'integer', 'required': False, 'description': f'Number of users to return (1-{MAX_LEADERBOARD_SIZE}, default {DEFAULT_LEADERBOARD_SIZE})'}
+        ],
+        'responses': {
+            200: {'description': 'Success'},
+            400: {'description': 'Invalid week or n, or the week is outside the leaderboard window'},
+            401: {'description': 'Bearer token is missing or Token has expired or Invalid token'}
+        },
+        'security': [{'Bearer': []}]
+    })
+    def get_leaderboard():
+        leaderboard = app.extensions['leaderboard']
+
+        try:
+            week = week_of(dates.parse_ymd(request.args['week']) if request.args.get('week') else dates.today())
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use yyyy-mm-dd."}), 400
+
+        if not leaderboard.is_tracked(week):
+            return jsonify({"error": f"Only the last {leaderboard.weeks} weeks are ranked"}), 400
+
+        try:
+            n = int(request.args.get('n', DEFAULT_LEADERBOARD_SIZE))
+        except ValueError:
+            return jsonify({"error": "n must be a number"}), 400
+        if not 1 <= n <= MAX_LEADERBOARD_SIZE:
+            return jsonify({"error": f"n must be between 1 and {MAX_LEADERBOARD_SIZE}"}), 400
+
+        return jsonify({
+            'week_start': dates.format_day(week_start(week)),
+            'top': leaderboard.top(week, n),
+            'me': leaderboard.rank(week, g.user['username'])
+        }), 200
+
     app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""Day numbers: dates stored as whole days since 1970-01-01.
+
+Goals and day entries keep their dates as these integers, so range filters and
+overlap checks compare plain ints and the index keys stay small. Request dates
+arrive as dd-mm-yyyy (calories) or yyyy-mm-dd (progress); responses keep
+rendering yyyy-mm-dd.
+
+Run `python dates.py` for a micro-benchmark against the strptime/strftime path.
+"""
+import datetime
+from functools import lru_cache
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def _is_digits(value, start, end):
+    return value[start:end].isdigit() and value[start:end].isascii()
+
+
+def from_date(value):
+    """Day number of a date or datetime."""
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def to_date(day):
+    return datetime.date.fromordinal(day + _EPOCH_ORDINAL)
+
+
+def today():
+    return from_date(datetime.date.today())
+
+
+def parse_dmy(value):
+    """Parse dd-mm-yyyy into a day number; raises ValueError, also for a value that is not a string."""
+    if not isinstance(value, str):
+        raise ValueError(f'Expected a dd-mm-yyyy string, got {type(value).__name__}')
+    return _parse_dmy(value)
+
+
+def parse_ymd(value):
+    """Parse yyyy-mm-dd into a day number; raises ValueError, also for a value that is not a string."""
+    if not isinstance(value, str):
+        raise ValueError(f'Expected a yyyy-mm-dd string, got {type(value).__name__}')
+    return _parse_ymd(value)
+
+
+@lru_cache(maxsize=4096)
+def _parse_dmy(value):
+    if len(value) == 10 and value[2] == '-' and value[5] == '-' and _is_digits(value, 0, 2) and _is_digits(value, 3, 5) and _is_digits(value, 6, 10):
+        return from_date(datetime.date(int(value[6:10]), int(value[3:5]), int(value[0:2])))
+    # Slow path keeps strptime's leniency, e.g. unpadded 1-2-2024.
+    return from_date(datetime.datetime.strptime(value, '%d-%m-%Y'))
+
+
+@lru_cache(maxsize=4096)
+def _parse_ymd(value):
+    if len(value) == 10 and value[4] == '-' and value[7] == '-' and _is_digits(value, 0, 4) and _is_digits(value, 5, 7) and _is_digits(value, 8, 10):
+        return from_date(datetime.date(int(value[0:4]), int(value[5:7]), int(value[8:10])))
+    return from_date(datetime.datetime.strptime(value, '%Y-%m-%d'))
+
+
+@lru_cache(maxsize=4096)
+def format_day(day):
+    """Render a day number as yyyy-mm-dd."""
+    return to_date(day).isoformat()
+
+
+if __name__ == '__main__':
+    import random
+    import timeit
+
+    samples = [(datetime.date(2020, 1, 1) + datetime.timedelta(days=random.randrange(2000))).strftime('%d-%m-%Y') for _ in range(10000)]
+
+    def strptime_path():
+        for value in samples:
+            datetime.datetime.strptime(value, '%d-%m-%Y').strftime('%Y-%m-%d')
+
+    def uncached_path():
+        for value in samples:
+            _parse_dmy.__wrapped__(value)
+
+    def cached_path():
+        for value in samples:
+            parse_dmy(value)
+
+    for name, fn in [('strptime + strftime', strptime_path), ('parse_dmy, uncached', uncached_path), ('parse_dmy, cached', cached_path)]:
+        best = min(timeit.repeat(fn, number=1, repeat=5))
+        print(f"{name:22} {best / len(samples) * 1e9:8.0f} ns/date")
@@ -0,0 +1,56 @@
+"""In-process cache of the exercise catalog, one JSON body per body part.
+
+Body part names are resolved by the shared BodyPartResolver, so names that
+differ only in case share one entry and a cached read makes no Mongo call.
+
+The catalog only changes through the admin exercise handlers, which call
+`invalidate()`. That bumps the catalog version and drops every cached body;
+bodies computed under an older version are never stored. Entries also expire
+after `ttl` seconds so other worker processes pick up admin writes.
+
+ETags are a hash of the body, so they agree across processes and restarts.
+"""
+import hashlib
+import threading
+import time
+
+
+class ExerciseCatalog:
+    def __init__(self, body_parts, exercises_collection, dumps, ttl):
+        self.body_parts = body_parts
+        self.exercises_collection = exercises_collection
+        self.dumps = dumps
+        self.ttl = ttl
+        self.version = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, body_part):
+        """(body bytes, etag) of the body part's exercises, or None if there is no such body part."""
+        body_part_document = self.body_parts.resolve(body_part)
+        if not body_part_document:
+            return None
+        body_part_id = body_part_document['_id']
+
+        with self._lock:
+            version = self.version
+            entry = self._entries.get(body_part_id)
+            if entry is not None and entry[2] > time.time():
+                return entry[0], entry[1]
+
+        exercises = list(self.exercises_collection.find({'bodyPart_ref': str(body_part_id)}))
+        for exercise in exercises:
+            exercise['_id'] = str(exercise['_id'])
+            exercise['bodyPart_ref'] = str(exercise['bodyPart_ref'])
+        body = self.dumps(exercises).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()
+
+        with self._lock:
+            if self.version == version:
+                self._entries[body_part_id] = (body, etag, time.time() + self.ttl)
+        return body, etag
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
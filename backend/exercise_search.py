@@ -0,0 +1,305 @@
+"""In-memory search over exercise names and descriptions.
+
+An inverted index maps each word to the exercises containing it, weighted so
+a name match counts more than a description match. The vocabulary also lives
+in a prefix trie, which serves two kinds of lookup:
+- the last word of a query is completed as a prefix (autocomplete);
+- any word not in the vocabulary is matched within a small edit distance
+  (adjacent swaps included), found by walking the trie with one edit-distance
+  row per node.
+
+Results rank by how many query words matched, then by score, then by name.
+Each word's postings are also kept sorted by (weight, name), so a one-word
+query (the autocomplete case) reads at most `limit` entries per matching term
+instead of every posting. Longer queries scan the postings of their rarest
+word and look the others up.
+
+The index is built at startup and kept current by the admin exercise handlers.
+Those only reach this process, so once the index is `ttl` seconds old the next
+search starts a rebuild from the collection in the background and keeps
+answering from the current index meanwhile. A rebuild that overlaps an admin
+write is discarded, as the catalog cache does, and retried by a later search.
+
+Run `python exercise_search.py` to time queries over 100k generated exercises.
+"""
+import heapq
+import re
+import threading
+import time
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+PREFIX_FACTOR = 0.8
+TYPO_FACTOR = 0.5
+MAX_PREFIX_TERMS = 50
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return _WORD.findall((text or '').lower())
+
+
+def max_typos(term):
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+class _TrieNode:
+    __slots__ = ('children', 'is_term')
+
+    def __init__(self):
+        self.children = {}
+        self.is_term = False
+
+
+class ExerciseSearch:
+    def __init__(self, exercises_collection, ttl):
+        self.exercises_collection = exercises_collection
+        self.ttl = ttl
+        self.version = 0
+        self._postings = {}
+        self._ranked = {}
+        self._terms_by_exercise = {}
+        self._exercises = {}
+        self._root = _TrieNode()
+        self._expires_at = 0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def build(self, exercises):
+        """Replace the index with one over `exercises`, unless an admin write landed while it was built."""
+        with self._lock:
+            version = self.version
+        fresh = ExerciseSearch(None, self.ttl)
+        for exercise in exercises:
+            fresh._add(exercise)
+
+        with self._lock:
+            if self.version != version:
+                return
+            self._postings, self._ranked = fresh._postings, fresh._ranked
+            self._terms_by_exercise, self._exercises, self._root = fresh._terms_by_exercise, fresh._exercises, fresh._root
+            self._expires_at = time.time() + self.ttl
+
+    def rebuild(self):
+        self.build(self.exercises_collection.find())
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _refresh(self):
+        with self._lock:
+            if self._rebuilding or self._expires_at > time.time():
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name='exercise-search-rebuild', daemon=True).start()
+
+    def invalidate(self):
+        """Rebuild from the collection on the next search."""
+        with self._lock:
+            self._expires_at = 0
+
+    def add(self, exercise):
+        with self._lock:
+            self.version += 1
+            self._remove(str(exercise['_id']))
+            self._add(exercise)
+
+    def remove(self, exercise_id):
+        with self._lock:
+            self.version += 1
+            self._remove(str(exercise_id))
+
+    def _add(self, exercise):
+        exercise_id = str(exercise['_id'])
+        weights = {}
+        for term in tokenize(exercise.get('description')):
+            weights[term] = max(weights.get(term, 0), DESCRIPTION_WEIGHT)
+        for term in tokenize(exercise.get('name')):
+            weights[term] = NAME_WEIGHT
+
+        self._exercises[exercise_id] = dict(exercise, _id=exercise_id, bodyPart_ref=str(exercise.get('bodyPart_ref')))
+        self._terms_by_exercise[exercise_id] = list(weights)
+        for term, weight in weights.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                self._trie_insert(term)
+            self._postings[term][exercise_id] = weight
+            self._ranked.pop(term, None)
+
+    def _remove(self, exercise_id):
+        for term in self._terms_by_exercise.pop(exercise_id, []):
+            postings = self._postings[term]
+            postings.pop(exercise_id, None)
+            self._ranked.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                self._trie_delete(term)
+        self._exercises.pop(exercise_id, None)
+
+    def _trie_insert(self, term):
+        node = self._root
+        for char in term:
+            node = node.children.setdefault(char, _TrieNode())
+        node.is_term = True
+
+    def _trie_delete(self, term):
+        path = [self._root]
+        for char in term:
+            path.append(path[-1].children[char])
+        path[-1].is_term = False
+        # Prune the branch back to the last node that is still needed
+        for depth in range(len(term), 0, -1):
+            node = path[depth]
+            if node.is_term or node.children:
+                break
+            del path[depth - 1].children[term[depth - 1]]
+
+    def _completions(self, prefix):
+        """Up to MAX_PREFIX_TERMS vocabulary terms starting with `prefix`, shortest first."""
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        terms, level = [], [(prefix, node)]
+        while level and len(terms) < MAX_PREFIX_TERMS:
+            next_level = []
+            for term, node in level:
+                if node.is_term:
+                    terms.append(term)
+                next_level.extend((term + char, child) for char, child in node.children.items())
+            level = next_level
+        return terms[:MAX_PREFIX_TERMS]
+
+    def _near_terms(self, word, limit):
+        """Vocabulary terms within `limit` edits of `word`, counting a swap of adjacent letters as one edit."""
+        matches = []
+        first_row = list(range(len(word) + 1))
+
+        def walk(node, char, term, previous_row, row_before):
+            row = [previous_row[0] + 1]
+            for column in range(1, len(word) + 1):
+                cost = min(
+                    row[column - 1] + 1,
+                    previous_row[column] + 1,
+                    previous_row[column - 1] + (word[column - 1] != char)
+                )
+                if column > 1 and len(term) > 1 and word[column - 1] == term[-2] and word[column - 2] == char:
+                    cost = min(cost, row_before[column - 2] + 1)
+                row.append(cost)
+            if row[-1] <= limit and node.is_term:
+                matches.append(term)
+            if min(row) <= limit:
+                for next_char, child in node.children.items():
+                    walk(child, next_char, term + next_char, row, previous_row)
+
+        for char, child in self._root.children.items():
+            walk(child, char, char, first_row, None)
+        return matches
+
+    def _candidates(self, word, is_last):
+        """(term, factor) pairs a query word can match."""
+        if word in self._postings:
+            candidates = [(word, 1.0)]
+        else:
+            candidates = []
+        if is_last:
+            candidates += [(term, PREFIX_FACTOR) for term in self._completions(word) if term != word]
+        if not candidates and max_typos(word):
+            candidates = [(term, TYPO_FACTOR) for term in self._near_terms(word, max_typos(word))]
+        return candidates
+
+    def _sort_key(self, exercise_id, score):
+        return (-score, self._exercises[exercise_id].get('name') or '')
+
+    def _ranked_postings(self, term):
+        """The term's exercise ids, best first; sorted lazily after the term changes."""
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            postings = self._postings[term]
+            ranked = self._ranked[term] = sorted(postings, key=lambda exercise_id: self._sort_key(exercise_id, postings[exercise_id]))
+        return ranked
+
+    def _score(self, candidates, exercise_id):
+        return max((self._postings[term].get(exercise_id, 0) * factor for term, factor in candidates), default=0)
+
+    def _search_one_word(self, candidates, limit):
+        # A result's score comes from a single term, so the top `limit` of each term cover the overall top `limit`
+        scores = {}
+        for term, factor in candidates:
+            postings = self._postings[term]
+            for exercise_id in self._ranked_postings(term)[:limit]:
+                scores[exercise_id] = max(scores.get(exercise_id, 0), postings[exercise_id] * factor)
+        return heapq.nsmallest(limit, scores, key=lambda exercise_id: self._sort_key(exercise_id, scores[exercise_id]))
+
+    def _search_all_words(self, candidates_by_word, limit):
+        """Exercises matching every word, best first; None if there are fewer than `limit`."""
+        rarest = min(candidates_by_word, key=lambda candidates: sum(len(self._postings[term]) for term, _ in candidates))
+        scores = {}
+        for term, _ in rarest:
+            for exercise_id in self._postings[term]:
+                if exercise_id in scores:
+                    continue
+                word_scores = [self._score(candidates, exercise_id) for candidates in candidates_by_word]
+                if all(word_scores):
+                    scores[exercise_id] = sum(word_scores)
+        if len(scores) < limit:
+            return None
+        return heapq.nsmallest(limit, scores, key=lambda exercise_id: self._sort_key(exercise_id, scores[exercise_id]))
+
+    def _search_any_word(self, candidates_by_word, limit):
+        matched, scores = {}, {}
+        for candidates in candidates_by_word:
+            best = {}
+            for term, factor in candidates:
+                for exercise_id, weight in self._postings[term].items():
+                    if weight * factor > best.get(exercise_id, 0):
+                        best[exercise_id] = weight * factor
+            for exercise_id, score in best.items():
+                matched[exercise_id] = matched.get(exercise_id, 0) + 1
+                scores[exercise_id] = scores.get(exercise_id, 0) + score
+        return heapq.nsmallest(limit, scores, key=lambda exercise_id: (-matched[exercise_id],) + self._sort_key(exercise_id, scores[exercise_id]))
+
+    def search(self, query, limit):
+        self._refresh()
+        words = tokenize(query)
+        with self._lock:
+            candidates_by_word = [self._candidates(word, position == len(words) - 1) for position, word in enumerate(words)]
+            candidates_by_word = [candidates for candidates in candidates_by_word if candidates]
+            if not candidates_by_word:
+                return []
+
+            if len(candidates_by_word) == 1:
+                ranked = self._search_one_word(candidates_by_word[0], limit)
+            else:
+                ranked = self._search_all_words(candidates_by_word, limit)
+                if ranked is None:
+                    ranked = self._search_any_word(candidates_by_word, limit)
+            return [self._exercises[exercise_id] for exercise_id in ranked]
+
+
+if __name__ == '__main__':
+    import random
+    import timeit
+
+    random.seed(0)
+    syllables = ['pus', 'pul', 'squa', 'lun', 'ben', 'cur', 'pre', 'row', 'dip', 'pla', 'bri', 'cra', 'dead', 'lif', 'ext', 'fly']
+    words = list({''.join(random.choice(syllables) for _ in range(random.randint(1, 3))) for _ in range(5000)})
+    search = ExerciseSearch(None, float('inf'))
+    search.build(
+        {'_id': index, 'name': ' '.join(random.sample(words, 2)), 'description': ' '.join(random.sample(words, 8)), 'bodyPart_ref': 'chest'}
+        for index in range(100000)
+    )
+    sample = random.choice(words)
+    search.search(sample[:3], 10)
+    for query in [sample[:3], sample, sample[:-1] + 'x ' + words[0][:2]]:
+        best = min(timeit.repeat(lambda: search.search(query, 10), number=20, repeat=3)) / 20
+        print(f"{query!r:28} {best * 1e3:8.3f} ms")
@@ -0,0 +1,90 @@
+from flask import Blueprint, Response, request, jsonify, g, stream_with_context
+from flasgger import swag_from
+import dates
+from export_lines import MIMETYPES, encode
+
+EXPORT_BATCH_SIZE = 500
+
+# Every exported record has these keys; fields that do not apply to a record type are left empty
+EXPORT_FIELDS = ['type', 'goal_id', 'activity', 'goal', 'start_date', 'end_date', 'date', 'progress', 'calories']
+
+
+def init_export_routes(app, mongo):
+    export_bp = Blueprint('export', __name__)
+    progress_tracker_collection = mongo.db.progress_tracker
+    calories_tracker_collection = mongo.db.calories_tracker
+    daily_calories_log_collection = mongo.db.daily_calories_log
+
+    def goal_record(record_type, goal, total_field, total):
+        return {
+            'type': record_type,
+            'goal_id': str(goal['_id']),
+            'activity': goal.get('activity'),
+            'goal': goal.get('goal'),
+            'start_date': dates.format_day(goal['start_date']),
+            'end_date': dates.format_day(goal['end_date']),
+            total_field: total
+        }
+
+    def records(username):
+        """Yield every goal and day entry of the user, one cursor batch at a time."""
+        cursor = progress_tracker_collection.find(
+            {'username': username},
+            {'activity': 1, 'goal': 1, 'start_date': 1, 'end_date': 1, 'progress_total': 1, 'progresses': 1}
+        ).sort([('start_date', 1), ('_id', 1)]).batch_size(EXPORT_BATCH_SIZE)
+        try:
+            for goal in cursor:
+                yield goal_record('progress_goal', goal, 'progress', goal.get('progress_total', 0))
+                for entry in sorted(goal.get('progresses', []), key=lambda entry: entry['date']):
+                    yield {'type': 'progress_entry', 'goal_id': str(goal['_id']), 'date': dates.format_day(entry['date']), 'progress': entry['progress']}
+        finally:
+            cursor.close()
+
+        cursor = calories_tracker_collection.find(
+            {'username': username},
+            {'activity': 1, 'goal': 1, 'start_date': 1, 'end_date': 1, 'calories_burned': 1}
+        ).sort([('start_date', 1), ('_id', 1)]).batch_size(EXPORT_BATCH_SIZE)
+        try:
+            for goal in cursor:
+                yield goal_record('calories_goal', goal, 'calories', goal.get('calories_burned', 0))
+        finally:
+            cursor.close()
+
+        cursor = daily_calories_log_collection.find(
+            {'username': username},
+            {'_id': 0, 'goal_id': 1, 'date': 1, 'calories': 1}
+        ).sort('date', 1).batch_size(EXPORT_BATCH_SIZE)
+        try:
+            for log in cursor:
+                yield {'type': 'calories_entry', 'goal_id': str(log['goal_id']), 'date': dates.format_day(log['date']), 'calories': log['calories']}
+        finally:
+            cursor.close()
+
+    @export_bp.route('', methods=['GET'])
+    @swag_from({
+        'tags': ['Export'],
+        'summary': 'Export all progress and calorie data',
+        'description': 'Stream every progress goal with its day entries, then every calorie goal, then every calorie day entry. '
+                       'Each record has the fields ' + ', '.join(EXPORT_FIELDS) + '; fields that do not apply to a record type are empty.',
+        'produces': ['application/x-ndjson', 'text/csv'],
+        'parameters': [
+            {'name': 'format', 'in': 'query', 'required': False, 'type': 'string', 'enum': ['ndjson', 'csv'], 'description': 'Output format (default ndjson)'}
+        ],
+        'responses': {
+            200: {'description': 'The export, one record per line.'},
+            400: {'description': 'Unsupported format.'},
+            401: {'description': 'Bearer token is missing or Token has expired or Invalid token.'}
+        },
+        'security': [{'Bearer': []}]
+    })
+    def export_data():
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in MIMETYPES:
+            return jsonify({"error": "Format must be csv or ndjson"}), 400
+
+        lines = encode(export_format, records(g.user['username']), EXPORT_FIELDS)
+        response = Response(stream_with_context(lines), mimetype=MIMETYPES[export_format])
+        response.headers['Content-Disposition'] = f'attachment; filename=export.{export_format}'
+        return response
+
+    app.register_blueprint(export_bp, url_prefix='/export')
@@ -0,0 +1,43 @@
+"""Line-at-a-time encoders shared by the streamed exports.
+
+Each encoder takes an iterable of record dicts and yields one line per record,
+so a response can stream straight from a Mongo cursor.
+"""
+import csv
+import io
+import json
+
+MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record) + '\n'
+
+
+def csv_lines(records, fieldnames):
+    """A header row, then one row per record; keys missing from a record are left empty."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+
+    def drain():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writeheader()
+    yield drain()
+    for record in records:
+        writer.writerow(record)
+        yield drain()
+
+
+def encode(export_format, records, fieldnames):
+    """The lines of `records` in `export_format`, one of MIMETYPES."""
+    if export_format == 'csv':
+        return csv_lines(records, fieldnames)
+    return ndjson_lines(records)
@@ -0,0 +1,125 @@
+"""Overlap detection for a user's goal periods.
+
+Goals of one kind never overlap, so the only goal that can collide with a new
+period [start, end] is the one with the latest start_date <= end: a single
+seek on the (username, start_date) index instead of a scan of every goal.
+
+The check alone is racy, so creating a goal happens under a per-user lock
+document in `goal_locks`. Its _id is "<kind>:<username>", so only one request
+can hold it; a lock left behind by a crashed request is taken over once it
+expires.
+
+The dashboard finds the goal covering today with the same seek.
+
+Run `python goal_periods.py` to benchmark both lookups against the old queries
+for 10 to 10,000 goals per user.
+"""
+from contextlib import contextmanager
+import datetime
+import time
+from bson import ObjectId
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+LOCK_TIMEOUT = 10
+LOCK_ATTEMPTS = 20
+LOCK_RETRY_DELAY = 0.05
+
+
+class GoalPeriodLocked(Exception):
+    pass
+
+
+class GoalPeriods:
+    def __init__(self, goals_collection, locks_collection, kind):
+        self.goals_collection = goals_collection
+        self.locks_collection = locks_collection
+        self.kind = kind
+
+    def find_overlap(self, username, start_day, end_day, projection=None):
+        latest = self.goals_collection.find_one(
+            {'username': username, 'start_date': {'$lte': end_day}},
+            dict(projection or {}, start_date=1, end_date=1),
+            sort=[('start_date', DESCENDING)]
+        )
+        if latest and latest['end_date'] >= start_day:
+            return latest
+        return None
+
+    def _acquire(self, lock_id, owner):
+        now = datetime.datetime.utcnow()
+        try:
+            # Matches only an expired lock; with none at all the upsert inserts a fresh one
+            self.locks_collection.update_one(
+                {'_id': lock_id, 'expires_at': {'$lte': now}},
+                {'$set': {'owner': owner, 'expires_at': now + datetime.timedelta(seconds=LOCK_TIMEOUT)}},
+                upsert=True
+            )
+        except DuplicateKeyError as e:
+            if e.code != 11000:
+                raise
+            return False
+        return True
+
+    @contextmanager
+    def lock(self, username):
+        """Hold the user's goal lock for the block; raises GoalPeriodLocked if it stays busy."""
+        lock_id = f'{self.kind}:{username}'
+        owner = ObjectId()
+        for attempt in range(LOCK_ATTEMPTS):
+            if self._acquire(lock_id, owner):
+                break
+            time.sleep(LOCK_RETRY_DELAY)
+        else:
+            raise GoalPeriodLocked()
+        try:
+            yield
+        finally:
+            self.locks_collection.delete_one({'_id': lock_id, 'owner': owner})
+
+
+if __name__ == '__main__':
+    from pymongo import MongoClient
+    from config import Config
+    from indexes import INDEXES
+
+    db = MongoClient(Config.MONGO_URI).get_database('fitness-tracking-benchmark')
+    periods = GoalPeriods(db.calories_tracker, db.goal_locks, 'calories')
+
+    def timed(fn, runs=200):
+        began = time.perf_counter()
+        for _ in range(runs):
+            fn()
+        return (time.perf_counter() - began) / runs * 1e3
+
+    # Latency should stay flat as a user's goal history grows; the old queries grow with it
+    for goal_count in (10, 100, 1000, 10000):
+        db.calories_tracker.drop()
+        db.calories_tracker.create_indexes(INDEXES['calories_tracker'])
+        db.calories_tracker.insert_many([
+            {'username': 'bench', 'start_date': 7 * week, 'end_date': 7 * week + 6, 'goal': 1000, 'calories_burned': 0}
+            for week in range(goal_count)
+        ])
+        today = 7 * (goal_count - 1) + 3
+        start_day, end_day = 7 * goal_count, 7 * goal_count + 6
+
+        def old_overlap():
+            return db.calories_tracker.find_one({
+                'username': 'bench',
+                '$or': [
+                    {'start_date': {'$lte': end_day, '$gte': start_day}},
+                    {'end_date': {'$gte': start_day, '$lte': end_day}},
+                    {'start_date': {'$lte': start_day}, 'end_date': {'$gte': end_day}}
+                ]
+            })
+
+        def old_current():
+            return db.calories_tracker.find_one({'username': 'bench', 'start_date': {'$lte': today}, 'end_date': {'$gte': today}})
+
+        print(
+            f"{goal_count:6} goals  "
+            f"overlap: $or {timed(old_overlap):7.3f} ms, seek {timed(lambda: periods.find_overlap('bench', start_day, end_day)):7.3f} ms  "
+            f"current goal: range {timed(old_current):7.3f} ms, seek {timed(lambda: periods.find_overlap('bench', today, today)):7.3f} ms"
+        )
+
+    db.client.drop_database('fitness-tracking-benchmark')
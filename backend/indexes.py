@@ -0,0 +1,151 @@
+"""Index declarations for every collection the app queries.
+
+Usage: python indexes.py [--verify]
+"""
+import argparse
+import logging
+import sys
+from pymongo import MongoClient, IndexModel, ASCENDING
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    'users': [
+        IndexModel([('username', ASCENDING)], name='username_unique', unique=True),
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+    ],
+    'sessions': [
+        # Default names, as created by earlier releases, so existing deployments match
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_1', expireAfterSeconds=0),
+        IndexModel([('username', ASCENDING)], name='username_1'),
+    ],
+    'calories_tracker': [
+        IndexModel([('username', ASCENDING), ('start_date', ASCENDING), ('end_date', ASCENDING)], name='username_period'),
+        IndexModel([('username', ASCENDING), ('start_date', ASCENDING), ('_id', ASCENDING)], name='username_start_date_id'),
+    ],
+    'daily_calories_log': [
+        IndexModel([('username', ASCENDING), ('date', ASCENDING)], name='username_date_unique', unique=True),
+        IndexModel([('goal_id', ASCENDING)], name='goal_id'),
+        IndexModel([('date', ASCENDING), ('username', ASCENDING)], name='date_username'),
+    ],
+    'progress_tracker': [
+        IndexModel([('username', ASCENDING), ('start_date', ASCENDING), ('end_date', ASCENDING)], name='username_period'),
+        IndexModel([('username', ASCENDING), ('start_date', ASCENDING), ('_id', ASCENDING)], name='username_start_date_id'),
+    ],
+    'goal_locks': [
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0),
+    ],
+    'exercises': [
+        IndexModel([('bodyPart_ref', ASCENDING)], name='bodyPart_ref'),
+    ],
+    'bodyParts': [
+        IndexModel([('name', ASCENDING)], name='name'),
+    ],
+}
+
+# Representative filters for the queries the route handlers issue.
+HANDLER_QUERIES = [
+    ('users', {'username': 'user'}),
+    ('users', {'email': 'user@example.com'}),
+    ('sessions', {'_id': 'token-hash'}),
+    ('sessions', {'username': 'user'}),
+    ('calories_tracker', {'username': 'user'}),
+    ('calories_tracker', {'username': 'user', 'start_date': {'$lte': 19723}, 'end_date': {'$gte': 19723}}),
+    ('calories_tracker', {'username': 'user', 'start_date': 19723, 'end_date': 19729}),
+    ('calories_tracker', {'username': 'user', 'start_date': {'$lte': 19729}}),
+    ('daily_calories_log', {'username': 'user', 'date': 19723}),
+    ('daily_calories_log', {'username': 'user', 'date': {'$gte': 19723, '$lte': 20088}}),
+    ('daily_calories_log', {'goal_id': 'goal-id'}),
+    ('daily_calories_log', {'date': {'$gte': 19723}}),
+    ('progress_tracker', {'username': 'user'}),
+    ('progress_tracker', {'username': 'user', 'start_date': {'$lte': 19723}, 'end_date': {'$gte': 19723}}),
+    ('progress_tracker', {'username': 'user', 'start_date': {'$lte': 19729}}),
+    ('exercises', {'bodyPart_ref': 'body-part-id'}),
+    ('bodyParts', {'name': 'chest'}),
+]
+
+
+def find_duplicate(collection, model):
+    """A key value held by more than one document, which would make `model`'s unique index fail; None if there is none."""
+    fields = list(model.document['key'])
+    for row in collection.aggregate([
+        {'$group': {'_id': {f'key{position}': f'${field}' for position, field in enumerate(fields)}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}},
+        {'$limit': 1}
+    ], allowDiskUse=True):
+        return {field: row['_id'].get(f'key{position}') for position, field in enumerate(fields)}
+    return None
+
+
+def ensure_indexes(db):
+    """Create every declared index; existing indexes with the same spec are left alone.
+
+    A unique index that does not exist yet is only built once its keys are
+    unique: while duplicates remain it is skipped with a warning instead of
+    failing startup. Returns the names of the skipped indexes.
+    """
+    skipped = []
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        buildable = []
+        for model in models:
+            name = model.document['name']
+            if model.document.get('unique') and name not in existing:
+                duplicate = find_duplicate(collection, model)
+                if duplicate is not None:
+                    logger.warning('Not creating unique index %s.%s: several documents have %s', collection_name, name, duplicate)
+                    skipped.append(f'{collection_name}.{name}')
+                    continue
+            buildable.append(model)
+        if buildable:
+            collection.create_indexes(buildable)
+    return skipped
+
+
+def _plan_stages(plan):
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+def find_collection_scans(db):
+    """Return the handler queries whose winning plan contains a COLLSCAN."""
+    scans = []
+    for collection_name, query in HANDLER_QUERIES:
+        explain = db[collection_name].find(query).explain()
+        if 'COLLSCAN' in _plan_stages(explain['queryPlanner']['winningPlan']):
+            scans.append((collection_name, query))
+    return scans
+
+
+def verify_query_plans(db):
+    scans = find_collection_scans(db)
+    if scans:
+        raise RuntimeError('Queries would do a COLLSCAN: ' + '; '.join(f'{name} {query}' for name, query in scans))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create the app indexes.')
+    parser.add_argument('--verify', action='store_true', help='fail if any handler query would do a COLLSCAN')
+    args = parser.parse_args()
+
+    db = MongoClient(Config.MONGO_URI).get_default_database()
+    skipped = ensure_indexes(db)
+    if skipped:
+        print('Skipped unique indexes until their duplicates are resolved: ' + ', '.join(skipped))
+    else:
+        print('Indexes are up to date')
+    if args.verify:
+        try:
+            verify_query_plans(db)
+        except RuntimeError as e:
+            print(e)
+            sys.exit(1)
+        print('No handler query does a COLLSCAN')
@@ -0,0 +1,133 @@
+"""Weekly calories leaderboard kept in memory.
+
+Weeks run Monday to Sunday and are numbered from the week of 1970-01-01, so a
+day number maps to its week with plain integer arithmetic. Each tracked week
+keeps every user's total and a list of (-total, username) kept sorted, so the
+top N is a slice and a user's rank is one bisect.
+
+The leaderboard is rebuilt from daily_calories_log at startup and then moved by
+the deltas the calorie handlers report. Those deltas only cover writes made by
+this process, so once it is `ttl` seconds old the next read starts a rebuild in
+the background and keeps answering from the current rankings meanwhile; every
+worker converges on the stored totals within that time. Only the last `weeks` weeks
+are held.
+"""
+from bisect import bisect_left, insort
+import threading
+import time
+import dates
+
+
+def week_of(day):
+    """Week number of a day number; 1970-01-01 was a Thursday."""
+    return (day + 3) // 7
+
+
+def week_start(week):
+    return week * 7 - 3
+
+
+class Leaderboard:
+    def __init__(self, daily_calories_log_collection, weeks, ttl):
+        self.daily_calories_log_collection = daily_calories_log_collection
+        self.weeks = weeks
+        self.ttl = ttl
+        self._totals = {}
+        self._rankings = {}
+        self._expires_at = 0
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def _oldest_week(self):
+        return week_of(dates.today()) - self.weeks + 1
+
+    def rebuild(self):
+        first_day = week_start(self._oldest_week())
+        totals, rankings = {}, {}
+        for row in self.daily_calories_log_collection.aggregate([
+            {'$match': {'date': {'$gte': first_day}}},
+            {'$group': {
+                '_id': {'username': '$username', 'week': {'$floor': {'$divide': [{'$add': ['$date', 3]}, 7]}}},
+                'calories': {'$sum': '$calories'}
+            }}
+        ]):
+            if row['calories'] > 0:
+                week = int(row['_id']['week'])
+                totals.setdefault(week, {})[row['_id']['username']] = row['calories']
+
+        for week, week_totals in totals.items():
+            rankings[week] = sorted((-total, username) for username, total in week_totals.items())
+
+        with self._lock:
+            self._totals, self._rankings = totals, rankings
+            self._expires_at = time.time() + self.ttl
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _refresh(self):
+        with self._lock:
+            if self._rebuilding or self._expires_at > time.time():
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name='leaderboard-rebuild', daemon=True).start()
+
+    def add(self, username, day, delta):
+        """Move `username`'s total for the week containing `day` by `delta` calories."""
+        week = week_of(day)
+        if not delta or week < self._oldest_week():
+            return
+
+        with self._lock:
+            totals = self._totals.setdefault(week, {})
+            ranking = self._rankings.setdefault(week, [])
+            previous = totals.get(username, 0)
+            if previous > 0:
+                del ranking[bisect_left(ranking, (-previous, username))]
+
+            total = previous + delta
+            if total > 0:
+                totals[username] = total
+                insort(ranking, (-total, username))
+            else:
+                totals.pop(username, None)
+
+            for old_week in [old_week for old_week in self._totals if old_week < self._oldest_week()]:
+                del self._totals[old_week]
+                del self._rankings[old_week]
+
+    def _rank(self, ranking, total):
+        # Ties share the best rank: count everyone with a strictly higher total
+        return bisect_left(ranking, (-total,)) + 1
+
+    def top(self, week, n):
+        self._refresh()
+        with self._lock:
+            ranking = self._rankings.get(week, [])
+            return [
+                {'rank': self._rank(ranking, -negative_total), 'username': username, 'calories': -negative_total}
+                for negative_total, username in ranking[:n]
+            ]
+
+    def rank(self, week, username):
+        """The user's rank and total for the week, or None if they logged nothing."""
+        self._refresh()
+        with self._lock:
+            total = self._totals.get(week, {}).get(username)
+            if total is None:
+                return None
+            return {'rank': self._rank(self._rankings[week], total), 'username': username, 'calories': total}
+
+    def is_tracked(self, week):
+        return self._oldest_week() <= week <= week_of(dates.today())
+
+
+def init_leaderboard(app, mongo):
+    leaderboard = Leaderboard(mongo.db.daily_calories_log, app.config['LEADERBOARD_WEEKS'], app.config['LEADERBOARD_REBUILD_INTERVAL'])
+    leaderboard.rebuild()
+    app.extensions['leaderboard'] = leaderboard
+    return leaderboard
@@ -1,30 +1,44 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_pymongo import PyMongo
-import bcrypt, jwt, datetime, re
+from pymongo.errors import DuplicateKeyError
+import jwt, datetime, re
 from flasgger import Swagger
 from flask_cors import CORS
 from config import Config
-from functools import wraps
+from auth import init_auth
+from leaderboard import init_leaderboard
+from indexes import ensure_indexes, verify_query_plans
+from passwords import PasswordHasher, PasswordPoolBusy, LoginThrottle
 from calories_tracker import init_calories_routes
 from workouts import init_workouts_routes
 from progressTracking import init_progress_routes
 from dashboard import init_dashboard_routes
 from admin import init_admin_routes
+from export import init_export_routes
 
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 mongo = PyMongo(app)
+ensure_indexes(mongo.db)
+if app.config['VERIFY_QUERY_PLANS']:
+    verify_query_plans(mongo.db)
+
 users_collection = mongo.db.users
 blacklist_collection = mongo.db.token_blacklist
-sessions_collection = mongo.db.sessions
 
+auth = init_auth(app, mongo)
+password_hasher = PasswordHasher(app.config['BCRYPT_ROUNDS'], app.config['PASSWORD_POOL_WORKERS'], app.config['PASSWORD_POOL_QUEUE'], app.config['PASSWORD_POOL_TIMEOUT'])
+username_throttle = LoginThrottle(app.config['LOGIN_MAX_FAILURES'], app.config['LOGIN_FAILURE_WINDOW'])
+ip_throttle = LoginThrottle(app.config['LOGIN_MAX_FAILURES_PER_IP'], app.config['LOGIN_FAILURE_WINDOW'])
+init_leaderboard(app, mongo)
 init_calories_routes(app, mongo)
 init_workouts_routes(app, mongo)
 init_progress_routes(app, mongo)
 init_dashboard_routes(app, mongo)
 init_admin_routes(app, mongo)
+init_export_routes(app, mongo)
 
 swagger_template = {
     "swagger": "2.0",
@@ -58,6 +72,10 @@ swagger = Swagger(app, template=swagger_template)
 
 CORS(app)  
 
+@app.errorhandler(PasswordPoolBusy)
+def password_pool_busy(e):
+    return jsonify({"error": "Server is busy, please try again shortly"}), 503, {'Retry-After': '1'}
+
 @app.route('/registration', methods=['POST'])
 def create_user():
     """Register a new user.
@@ -90,6 +108,8 @@ def create_user():
         description: User created successfully.
       400:
         description: Error message if registration fails.
+      503:
+        description: Password hashing pool is saturated, retry shortly.
     """
     data = request.get_json()
     username, password, email, age = data.get('username'), data.get('password'), data.get('email'), data.get('age')
@@ -102,17 +122,15 @@ def create_user():
     if len(password) < 8 or not re.search("[0-9]", password) or not re.search("[!@#$%^&*]", password):
         return jsonify({"error": "Password must be at least 8 characters long and contain at least one special character and one number"}), 400
 
-    existing_user = users_collection.find_one({'username': username})
-    if existing_user:
-        return jsonify({"error": "Username already exists"}), 400
-
-    existing_email = users_collection.find_one({'email': email})
-    if existing_email:
-        return jsonify({"error": "Email already exists"}), 400
-
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    hashed_password = password_hasher.hash(password)
     user_data = {'username': username, 'password': hashed_password, 'email': email, 'age': age, 'created_at': datetime.datetime.utcnow(), 'hasRole' : 'default'}
-    users_collection.insert_one(user_data)
+    try:
+        users_collection.insert_one(user_data)
+    except DuplicateKeyError as e:
+        # The unique indexes on username and email (see indexes.py) decide which field clashed
+        if 'email' in (e.details or {}).get('keyPattern', {}) or 'email_unique' in str(e):
+            return jsonify({"error": "Email already exists"}), 400
+        return jsonify({"error": "Username already exists"}), 400
     return jsonify({"message": "User created successfully"}), 201
 
 @app.route('/login', methods=['POST'])
@@ -139,65 +157,43 @@ def login():
         description: JWT token generated successfully.
       400:
         description: Error message if login fails.
+      429:
+        description: Too many failed login attempts for this username or client.
+      503:
+        description: Password hashing pool is saturated, retry shortly.
     """
     data = request.get_json()
     username, password = data.get('username'), data.get('password')
     if not username or not password:
         return jsonify({"error": "Username and password are required"}), 400
 
-    user = users_collection.find_one({'username': username})
+    # Failures count per (username, client) so nobody else can lock the owner out of an account;
+    # the per-IP cap still stops one client spraying many usernames
+    account_key = (username, request.remote_addr)
+    retry_after = max(username_throttle.retry_after(account_key), ip_throttle.retry_after(request.remote_addr))
+    if retry_after:
+        return jsonify({"error": "Too many failed login attempts, please try again later"}), 429, {'Retry-After': str(retry_after)}
+
+    user = users_collection.find_one({'username': username}, {'password': 1, 'hasRole': 1})
     if not user:
+        username_throttle.record_failure(account_key)
+        ip_throttle.record_failure(request.remote_addr)
         return jsonify({"error": "Invalid username or password"}), 400
 
-    if bcrypt.checkpw(password.encode('utf-8'), user['password']):
-        userData = users_collection.find_one({'username' : user['username']})
-        print("USERNAME :: ", userData['hasRole'])
-        token = jwt.encode({'username': username, 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=10), "sub": "fitnessTrackingSystem", "hasRole" : userData['hasRole']}, app.config['JWT_SECRET_KEY'], algorithm='HS256')
-
-        session_data = sessions_collection.find_one({'username': username})
-        if session_data:
-            sessions_collection.update_one(
-                {'username': username},
-                {'$push': {'tokens': token}}
-            )
-        else:
-            session_data = {
-                "username": username,
-                "tokens": [token]
-            }
-            sessions_collection.insert_one(session_data)
+    if password_hasher.check(password, user['password']):
+        username_throttle.reset(account_key)
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(minutes=10)
+        token = jwt.encode({'username': username, 'exp': expires_at, "sub": "fitnessTrackingSystem", "hasRole" : user['hasRole']}, app.config['JWT_SECRET_KEY'], algorithm='HS256')
+        auth.sessions.create(token, username, expires_at)
         return jsonify({"jwt_token": token}), 200
 
     else:
+        username_throttle.record_failure(account_key)
+        ip_throttle.record_failure(request.remote_addr)
         return jsonify({"error": "Invalid username or password"}), 400
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-
-        try:
-            data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
-            session_data = sessions_collection.find_one({"username": data['username']})
-            if not session_data:
-                return jsonify({'message': 'No active session for user {' + data['username'] + '} found!'}), 401
-            token_data = sessions_collection.find_one({"tokens": token})
-            if not token_data:
-                return jsonify({'message': 'Token is invalid '}), 401
-            request.user = data['username']
-        except Exception as e:
-            return jsonify({'message': 'Token is invalid!'}), 401
-
-        return f(*args, **kwargs)
-
-    return decorated
-
 @app.route('/logout', methods=['POST'])
-@token_required
+@auth.token_required
 def logout():
     """Logout a user by deleting their session.
     ---
@@ -207,13 +203,8 @@ def logout():
       400:
         description: Error message if logout fails.
     """
-    token = request.headers['Authorization'].split(" ")[1]
     try:
-        sessions_collection.update_one(
-            {"username": request.user},
-            {"$pull": {"tokens": token}}
-        )
-        sessions_collection.delete_one({"username": request.user})
+        auth.revoke(g.token)
         return jsonify({"message": "User logged out successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
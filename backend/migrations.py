@@ -0,0 +1,185 @@
+"""One-off data migrations and consistency repairs.
+
+Usage: python migrations.py <name>
+"""
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+import jwt
+from pymongo import MongoClient, ReplaceOne, DeleteOne, UpdateOne
+from config import Config
+from session_store import token_hash
+import dates
+
+
+def migrate_sessions(db):
+    """Split legacy `{username, tokens: [...]}` session documents into one document per token.
+
+    Tokens that are already expired are dropped instead of copied.
+    """
+    sessions_collection = db.sessions
+    now = datetime.datetime.utcnow()
+    operations = []
+    migrated = 0
+
+    for legacy in sessions_collection.find({'tokens': {'$exists': True}}):
+        for token in set(legacy['tokens']):
+            try:
+                payload = jwt.decode(token, options={'verify_signature': False})
+            except jwt.InvalidTokenError:
+                continue
+            expires_at = datetime.datetime.utcfromtimestamp(payload.get('exp', 0))
+            if expires_at <= now:
+                continue
+            session_id = token_hash(token)
+            operations.append(ReplaceOne({'_id': session_id}, {
+                '_id': session_id,
+                'username': legacy['username'],
+                'expires_at': expires_at,
+                'created_at': now
+            }, upsert=True))
+            migrated += 1
+        operations.append(DeleteOne({'_id': legacy['_id']}))
+
+    if operations:
+        sessions_collection.bulk_write(operations, ordered=False)
+    return migrated
+
+
+def migrate_calories_logs(db):
+    """Backfill `daily_calories_log` from the `calories_logs` arrays embedded in calorie goals.
+
+    The goal keeps `calories_burned`, which is recomputed from the backfilled entries.
+    Entry dates still stored as yyyy-mm-dd strings are converted to day numbers on
+    the way, so this can run before or after `dates`.
+    """
+    calories_tracker_collection = db.calories_tracker
+    daily_calories_log_collection = db.daily_calories_log
+    migrated = 0
+
+    for goal in calories_tracker_collection.find({'calories_logs': {'$exists': True}}):
+        entries = {
+            dates.parse_ymd(entry['date']) if isinstance(entry['date'], str) else entry['date']: entry['calories']
+            for entry in goal['calories_logs']
+        }
+        operations = [
+            UpdateOne(
+                {'username': goal['username'], 'date': date},
+                {'$set': {'calories': calories, 'goal_id': goal['_id']}},
+                upsert=True
+            ) for date, calories in entries.items()
+        ]
+        if operations:
+            daily_calories_log_collection.bulk_write(operations, ordered=False)
+        calories_tracker_collection.update_one(
+            {'_id': goal['_id']},
+            {'$set': {'calories_burned': sum(entries.values())}, '$unset': {'calories_logs': ''}}
+        )
+        migrated += len(operations)
+
+    return migrated
+
+
+def migrate_dates(db):
+    """Rewrite stored yyyy-mm-dd date strings as day numbers (see dates.py)."""
+    date_fields = [
+        (db.calories_tracker, ['start_date', 'end_date']),
+        (db.daily_calories_log, ['date']),
+        (db.progress_tracker, ['start_date', 'end_date', 'progresses.date']),
+    ]
+    migrated = 0
+
+    for collection, fields in date_fields:
+        operations = []
+        for document in collection.find({'$or': [{field: {'$type': 'string'}} for field in fields]}):
+            update = {
+                field: dates.parse_ymd(document[field])
+                for field in fields if isinstance(document.get(field), str)
+            }
+            if 'progresses' in document:
+                update['progresses'] = [
+                    dict(entry, date=dates.parse_ymd(entry['date']) if isinstance(entry['date'], str) else entry['date'])
+                    for entry in document['progresses']
+                ]
+            operations.append(UpdateOne({'_id': document['_id']}, {'$set': update}))
+            if len(operations) == 1000:
+                collection.bulk_write(operations, ordered=False)
+                operations = []
+            migrated += 1
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+
+    return migrated
+
+
+def repair_progress_totals(db, batch_size=1000, workers=8):
+    """Recompute `progress_total` from each progress goal's `progresses` array.
+
+    Goals are split into `_id` batches that are recomputed server-side in parallel;
+    safe to re-run whenever the running totals are suspected to have drifted.
+    """
+    progress_tracker_collection = db.progress_tracker
+    recompute = [{'$set': {'progress_total': {'$sum': {'$ifNull': ['$progresses.progress', []]}}}}]
+
+    def repair_batch(goal_ids):
+        return progress_tracker_collection.update_many({'_id': {'$in': goal_ids}}, recompute).modified_count
+
+    batches, batch = [], []
+    for goal in progress_tracker_collection.find({}, {'_id': 1}):
+        batch.append(goal['_id'])
+        if len(batch) == batch_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(repair_batch, batches))
+
+
+def repair_calories_totals(db, batch_size=1000, workers=8):
+    """Recompute `calories_burned` on each calorie goal from its `daily_calories_log` entries.
+
+    Logging a day writes the day entry and the goal total separately, so a failure
+    between the two leaves the total off by that day; safe to re-run at any time.
+    """
+    calories_tracker_collection = db.calories_tracker
+    daily_calories_log_collection = db.daily_calories_log
+
+    def repair_batch(goal_ids):
+        totals = {row['_id']: row['calories'] for row in daily_calories_log_collection.aggregate([
+            {'$match': {'goal_id': {'$in': goal_ids}}},
+            {'$group': {'_id': '$goal_id', 'calories': {'$sum': '$calories'}}}
+        ])}
+        operations = [UpdateOne({'_id': goal_id}, {'$set': {'calories_burned': totals.get(goal_id, 0)}}) for goal_id in goal_ids]
+        return calories_tracker_collection.bulk_write(operations, ordered=False).modified_count
+
+    batches, batch = [], []
+    for goal in calories_tracker_collection.find({}, {'_id': 1}):
+        batch.append(goal['_id'])
+        if len(batch) == batch_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(repair_batch, batches))
+
+
+MIGRATIONS = {
+    'sessions': migrate_sessions,
+    'calories_logs': migrate_calories_logs,
+    'dates': migrate_dates,
+    'progress_totals': repair_progress_totals,
+    'calories_totals': repair_calories_totals,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a one-off data migration.')
+    parser.add_argument('name', choices=sorted(MIGRATIONS))
+    args = parser.parse_args()
+
+    db = MongoClient(Config.MONGO_URI).get_default_database()
+    print(f"{args.name}: migrated {MIGRATIONS[args.name](db)} documents")
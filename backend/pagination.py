@@ -0,0 +1,65 @@
+"""Keyset pagination over a user's goals, ordered by (start_date, _id)."""
+import base64
+import json
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(goal):
+    raw = json.dumps([goal['start_date'], str(goal['_id'])]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(token):
+    try:
+        start_date, goal_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid next token")
+    # Anything else would reach the query as a filter value of the wrong type
+    if not isinstance(start_date, int) or isinstance(start_date, bool) or not isinstance(goal_id, str) or not ObjectId.is_valid(goal_id):
+        raise ValueError("Invalid next token")
+    return start_date, ObjectId(goal_id)
+
+
+def parse_page_args(args, allowed_fields):
+    """Read `limit`, `next` and `fields` from the query string.
+
+    Returns (limit, after, fields); raises ValueError with a message fit for the client.
+    """
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("Limit must be a number")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    after = decode_cursor(args['next']) if args.get('next') else None
+
+    fields = list(allowed_fields)
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        if not fields:
+            raise ValueError("Fields must name at least one field")
+        unknown = [field for field in fields if field not in allowed_fields]
+        if unknown:
+            raise ValueError("Unknown fields: " + ', '.join(unknown))
+
+    return limit, after, fields
+
+
+def find_page(collection, query, projection, limit, after=None):
+    """Return one page of documents and the token for the next page (None on the last page)."""
+    if after:
+        start_date, goal_id = after
+        query = {'$and': [query, {'$or': [
+            {'start_date': {'$gt': start_date}},
+            {'start_date': start_date, '_id': {'$gt': goal_id}}
+        ]}]}
+
+    projection = dict(projection, start_date=1)
+    documents = list(collection.find(query, projection).sort([('start_date', 1), ('_id', 1)]).limit(limit + 1))
+    if len(documents) > limit:
+        return documents[:limit], encode_cursor(documents[limit - 1])
+    return documents, None
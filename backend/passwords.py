@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import threading
+import time
+import bcrypt
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated pool instead of the request thread.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism here.
+    At most `workers + queue_size` calls are admitted at once; anything beyond
+    that raises PasswordPoolBusy straight away rather than queueing behind a burst.
+    """
+
+    def __init__(self, rounds, workers, queue_size, timeout):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordPoolBusy()
+
+    def hash(self, password):
+        return self._run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)))
+
+    def check(self, password, hashed):
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed)
+
+
+class LoginThrottle:
+    """Counts failed logins per key inside a fixed window."""
+
+    def __init__(self, max_failures, window, max_keys=100000):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_keys = max_keys
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def retry_after(self, key):
+        """Seconds until `key` may try again, or 0 if it is not blocked."""
+        with self._lock:
+            entry = self._failures.get(key)
+            if not entry:
+                return 0
+            count, window_start = entry
+            remaining = window_start + self.window - time.time()
+            if remaining <= 0:
+                del self._failures[key]
+                return 0
+            return int(remaining) + 1 if count >= self.max_failures else 0
+
+    def record_failure(self, key):
+        now = time.time()
+        with self._lock:
+            count, window_start = self._failures.get(key, (0, now))
+            if window_start + self.window <= now:
+                count, window_start = 0, now
+            self._failures[key] = (count + 1, window_start)
+            if len(self._failures) > self.max_keys:
+                self._prune(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def _prune(self, now):
+        for key in [k for k, (_, start) in self._failures.items() if start + self.window <= now]:
+            del self._failures[key]
+        # Still full of live entries: drop the oldest so an attacker cannot grow this without bound.
+        while len(self._failures) > self.max_keys:
+            del self._failures[next(iter(self._failures))]
@@ -1,39 +1,38 @@
 from flask import Blueprint, request, jsonify, g
 import datetime
-import jwt
-from functools import wraps
 from flasgger import swag_from
 from bson import ObjectId
+import dates
+from goal_periods import GoalPeriods, GoalPeriodLocked
+from pagination import parse_page_args, find_page
+from progress_buffer import ProgressBuffer
+
+# Response field -> goal document field, for GET /progress/all
+GOAL_FIELDS = {
+    'goal_id': '_id',
+    'goal': 'goal',
+    'activity': 'activity',
+    'progress': 'progress_total',
+    'start_date': 'start_date',
+    'end_date': 'end_date'
+}
 
 def init_progress_routes(app, mongo):
     progress_bp = Blueprint('progress', __name__)
     users_collection = mongo.db.users
     progress_tracker_collection = mongo.db.progress_tracker
-    sessions_collection = mongo.db.sessions
-
-    @app.before_request
-    def authenticate():
-        if request.path.startswith('/progress'):  
-            token = request.headers.get('Authorization')
-            if not token or not token.startswith('Bearer '):  
-                return jsonify({"error": "Bearer token is missing"}), 401
-            token = token.split('Bearer ')[1]  
-            try:
-                payload = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-                g.user = payload  
-                session = sessions_collection.find_one({'username': payload['username'], 'tokens': token})
-                if not session:
-                    return jsonify({"error": "Invalid token"}), 401
-            except jwt.ExpiredSignatureError:
-                return jsonify({"error": "Token has expired"}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({"error": "Invalid token"}), 401
+    goal_periods = GoalPeriods(progress_tracker_collection, mongo.db.goal_locks, 'progress')
+    progress_buffer = None
+    if app.config.get('PROGRESS_WRITE_BEHIND'):
+        progress_buffer = ProgressBuffer(progress_tracker_collection, app.config['PROGRESS_FLUSH_SIZE'], app.config['PROGRESS_FLUSH_INTERVAL'])
+        app.extensions['progress_buffer'] = progress_buffer
 
     @progress_bp.route('/goal', methods=['POST'])
     @swag_from({
         'tags': ['Progress'],
         'responses': {
             201: {'description': 'Goal set successfully'},
+            409: {'description': 'Another goal is being set for the user at the same time'},
             400: {'description': 'All fields are required or Invalid username or A goal already exists for the specified period'},
             401: {'description': 'Bearer token is missing or Token has expired or Invalid token'}
         },
@@ -67,38 +66,39 @@ def init_progress_routes(app, mongo):
         if not user:
             return jsonify({"error": "Invalid username"}), 400
 
-        start_date_obj = datetime.datetime.strptime(start_date, '%Y-%m-%d').strftime('%Y-%m-%d')
-        end_date_obj = datetime.datetime.strptime(end_date, '%Y-%m-%d').strftime('%Y-%m-%d')
+        try:
+            start_day = dates.parse_ymd(start_date)
+            end_day = dates.parse_ymd(end_date)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use yyyy-mm-dd."}), 400
 
-        overlapping_goal = progress_tracker_collection.find_one({
-            'username': username,
-            '$or': [
-                {'start_date': {'$lte': end_date_obj, '$gte': start_date_obj}},
-                {'end_date': {'$gte': start_date_obj, '$lte': end_date_obj}},
-                {'start_date': {'$lte': start_date_obj}, 'end_date': {'$gte': end_date_obj}}
-            ]
-        })
-
-        if overlapping_goal:
-            return jsonify({"error": "A goal already exists for the specified period"}), 400
+        if end_day < start_day:
+            return jsonify({"error": "End date must not be before the start date"}), 400
 
         goal_data = {
             'username': username,
-            'start_date': start_date_obj,
-            'end_date': end_date_obj,
+            'start_date': start_day,
+            'end_date': end_day,
             'goal': goal,
             'activity': activity,
             'progresses': [],
+            'progress_total': 0,
             'created_at': datetime.datetime.utcnow().strftime('%Y-%m-%d')
         }
-        progress_tracker_collection.insert_one(goal_data)
+        try:
+            with goal_periods.lock(username):
+                if goal_periods.find_overlap(username, start_day, end_day):
+                    return jsonify({"error": "A goal already exists for the specified period"}), 400
+                progress_tracker_collection.insert_one(goal_data)
+        except GoalPeriodLocked:
+            return jsonify({"error": "Another goal is being set, please try again"}), 409
         return jsonify({"message": "Goal set successfully"}), 201
 
     @progress_bp.route('', methods=['POST'])
     @swag_from({
         'tags': ['Progress'],
         'responses': {
-            200: {'description': 'Progress logged successfully'},
+            200: {'description': 'Progress logged successfully; with write-behind on, also buffered and max_staleness_seconds'},
             400: {'description': 'All fields are required or Invalid username or No active goal for this period'},
             401: {'description': 'Bearer token is missing or Token has expired or Invalid token'}
         },
@@ -130,28 +130,40 @@ def init_progress_routes(app, mongo):
         if not user:
             return jsonify({"error": "Invalid username"}), 400
 
-        log_date = datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
-        goal = progress_tracker_collection.find_one({'username': username, 'start_date': {'$lte': log_date}, 'end_date': {'$gte': log_date}})
+        try:
+            log_date = dates.parse_ymd(date)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use yyyy-mm-dd."}), 400
+
+        # Only the target is needed; the progresses array grows with every logged day
+        goal = progress_tracker_collection.find_one(
+            {'username': username, 'start_date': {'$lte': log_date}, 'end_date': {'$gte': log_date}},
+            {'goal': 1}
+        )
 
         if not goal:
             return jsonify({"error": "No active goal for this period"}), 400
 
+        message = "Progress logged successfully"
+        if progress_value >= goal['goal']:
+            message += " and goal achieved!"
+
+        if progress_buffer:
+            progress_buffer.add(username, goal['_id'], log_date, progress_value)
+            return jsonify({"message": message, "buffered": True, "max_staleness_seconds": progress_buffer.flush_interval}), 200
+
         result = progress_tracker_collection.update_one(
             {"_id": goal['_id'], "progresses.date": log_date},
-            {"$inc": {"progresses.$.progress": progress_value}}
+            {"$inc": {"progresses.$.progress": progress_value, "progress_total": progress_value}}
         )
 
         if result.matched_count == 0:
             # If no matching date was found, add a new element
             progress_tracker_collection.update_one(
                 {"_id": goal['_id']},
-                {"$push": {"progresses": {"date": log_date, "progress": progress_value}}}
+                {"$push": {"progresses": {"date": log_date, "progress": progress_value}}, "$inc": {"progress_total": progress_value}}
             )
 
-        message = "Progress logged successfully"
-        if progress_value >= goal['goal']:
-            message += " and goal achieved!"
-
         return jsonify({"message": message}), 200
 
     @progress_bp.route('/all', methods=['GET'])
@@ -159,10 +171,14 @@ def init_progress_routes(app, mongo):
         'tags': ['Progress'],
         'responses': {
             200: {'description': 'Success'},
-            400: {'description': 'Invalid username or No active goal'},
+            400: {'description': 'Invalid username or No active goal or Invalid limit, next token or fields'},
             401: {'description': 'Bearer token is missing or Token has expired or Invalid token'}
         },
-        'parameters': []
+        'parameters': [
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False, 'description': 'Goals per page (1-200, default 50)'},
+            {'name': 'next', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Opaque token from the previous page'},
+            {'name': 'fields', 'in': 'query', 'type': 'string', 'required': False, 'description': 'Comma-separated subset of goal_id, goal, activity, progress, start_date, end_date'}
+        ],
     })
     def get_progress():
         username = g.user['username']
@@ -170,26 +186,33 @@ def init_progress_routes(app, mongo):
         if not user:
             return jsonify({"error": "Invalid username"}), 400
 
-        goals = progress_tracker_collection.find({'username': username})
+        try:
+            limit, after, fields = parse_page_args(request.args, GOAL_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        goals, next_token = find_page(
+            progress_tracker_collection,
+            {'username': username},
+            {GOAL_FIELDS[field]: 1 for field in fields},
+            limit,
+            after
+        )
 
-        if not goals:
+        if not goals and not after:
             return jsonify({"error": "No active goal"}), 400
 
-        goalsResult = []
-        for goal in goals:
-            total_progress = sum(entry['progress'] for entry in goal['progresses'])
-
-            progress_data = {
-                'goal_id' : str(goal['_id']),
-                'goal': goal['goal'],
-                'activity': goal['activity'],
-                'progress': total_progress,
-                'start_date': goal['start_date'],
-                'end_date': goal['end_date']
-            }
-            goalsResult.append(progress_data)
+        def serialize(goal, field):
+            value = goal.get(GOAL_FIELDS[field])
+            if field == 'goal_id':
+                return str(value)
+            if field == 'progress':
+                return value or 0
+            return dates.format_day(value) if field in ('start_date', 'end_date') else value
+
+        goalsResult = [{field: serialize(goal, field) for field in fields} for goal in goals]
 
-        return jsonify(goalsResult), 200
+        return jsonify({"goals": goalsResult, "next": next_token}), 200
 
     @progress_bp.route('', methods=['GET'])
     @swag_from({
@@ -215,22 +238,27 @@ def init_progress_routes(app, mongo):
         if not user:
             return jsonify({"error": "Invalid username"}), 400
 
-        log_date = datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+        try:
+            log_date = dates.parse_ymd(date)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use yyyy-mm-dd."}), 400
+
+        # Only the matching day entry comes back, however long the goal has been running
         goal = progress_tracker_collection.find_one({
             'username': username,
             'start_date': {'$lte': log_date},
             'end_date': {'$gte': log_date}
-        })
+        }, {'progresses': {'$elemMatch': {'date': log_date}}})
 
         if not goal:
             return jsonify({"error": "No active goal for this period"}), 400
 
-        daily_log = next((entry for entry in goal['progresses'] if entry['date'] == log_date), None)
+        daily_log = goal.get('progresses', [None])[0]
 
         if not daily_log:
             return jsonify({"error": "No progress logged for this date"}), 400
 
-        return jsonify({"date": log_date, "progress": daily_log['progress']}), 200
+        return jsonify({"date": dates.format_day(log_date), "progress": daily_log['progress']}), 200
     
     @progress_bp.route('goal/<goal_id>', methods=['DELETE'])
     @swag_from({
@@ -290,27 +318,38 @@ def init_progress_routes(app, mongo):
         if not user:
             return jsonify({"error": "Invalid username"}), 400
 
-        log_date = datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+        try:
+            log_date = dates.parse_ymd(date)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use yyyy-mm-dd."}), 400
+
+        if progress_buffer:
+            # Otherwise a pending increment would bring the deleted entry back
+            progress_buffer.flush()
+
         goal = progress_tracker_collection.find_one({
             'username': username,
             'start_date': {'$lte': log_date},
             'end_date': {'$gte': log_date}
-        })
+        }, {'_id': 1})
 
         if not goal:
             return jsonify({"error": "No active goal for this period"}), 400
 
-        daily_log = next((entry for entry in goal['progresses'] if entry['date'] == log_date), None)
+        # One pipeline update subtracts the entry's stored amount and removes it, so a concurrent
+        # $inc on the same entry lands either before (and is subtracted with it) or after (and misses)
+        day_entries = {'$filter': {'input': '$progresses', 'cond': {'$eq': ['$$this.date', log_date]}}}
+        result = progress_tracker_collection.update_one(
+            {'_id': goal['_id'], 'progresses.date': log_date},
+            [
+                {'$set': {'progress_total': {'$subtract': ['$progress_total', {'$sum': {'$map': {'input': day_entries, 'in': '$$this.progress'}}}]}}},
+                {'$set': {'progresses': {'$filter': {'input': '$progresses', 'cond': {'$ne': ['$$this.date', log_date]}}}}}
+            ]
+        )
 
-        if not daily_log:
+        if result.matched_count == 0:
             return jsonify({"error": "No progress logged for this date"}), 400
 
-        # Remove the specific progress log for the date
-        progress_tracker_collection.update_one(
-            {'_id': goal['_id']},
-            {'$pull': {'progresses': {'date': log_date}}}
-        )
-
         return jsonify({"message": "Progress deleted successfully"}), 200
 
 
@@ -0,0 +1,114 @@
+"""Write-behind buffer for progress increments.
+
+Step counters post tiny increments every few seconds. With the buffer enabled
+(PROGRESS_WRITE_BEHIND=true) those increments are summed in memory per
+(goal, day) and written to `progress_tracker` in one bulk_write once
+`max_entries` keys are pending or `flush_interval` seconds have passed,
+whichever comes first. Reads may lag writes by up to `flush_interval`.
+
+The buffer is per process; pending increments are flushed on interpreter exit.
+Increments are only retried when they are known not to have been written: a
+write error stops the ordered bulk write, so the keys after the failing one
+are put back for the next flush, while the failing key itself is logged and
+dropped since retrying would fail the same way. Any other error leaves it
+unknown what was written, so the whole batch is logged and dropped rather than
+risk counting it twice.
+Callables in `listeners` are called with the usernames of each flushed batch.
+"""
+import atexit
+import logging
+import threading
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBuffer:
+    def __init__(self, collection, max_entries, flush_interval):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._usernames = set()
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='progress-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, username, goal_id, day, amount):
+        with self._lock:
+            key = (goal_id, day)
+            self._pending[key] = self._pending.get(key, 0) + amount
+            self._usernames.add(username)
+            full = len(self._pending) >= self.max_entries
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write every pending increment; returns the number of (goal, day) keys written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                usernames, self._usernames = self._usernames, set()
+            if not batch:
+                return 0
+
+            operations = []
+            for (goal_id, day), amount in batch.items():
+                # Ordered: create the day entry if it is missing, then increment it
+                operations.append(UpdateOne(
+                    {'_id': goal_id, 'progresses.date': {'$ne': day}},
+                    {'$push': {'progresses': {'date': day, 'progress': 0}}}
+                ))
+                operations.append(UpdateOne(
+                    {'_id': goal_id, 'progresses.date': day},
+                    {'$inc': {'progresses.$.progress': amount, 'progress_total': amount}}
+                ))
+            keys = list(batch)
+            try:
+                self.collection.bulk_write(operations, ordered=True)
+            except BulkWriteError as e:
+                # Operations 2k and 2k + 1 belong to key k. If the $inc (odd index) failed, its $push
+                # went through, but that only created the day entry; the increment itself was not applied.
+                failed_at = e.details['writeErrors'][0]['index'] // 2
+                goal_id, day = keys[failed_at]
+                logger.error('Progress flush dropped %s for goal %s on day %s: %s',
+                             batch[keys[failed_at]], goal_id, day, e.details['writeErrors'][0].get('errmsg'))
+                retried = keys[failed_at + 1:]
+                if retried:
+                    logger.warning('Progress flush stopped early; %d entries will be retried', len(retried))
+                    self._requeue([(key, batch[key]) for key in retried], usernames)
+                written = failed_at
+            except Exception:
+                logger.exception('Progress flush failed; %d entries were dropped', len(batch))
+                written = 0
+            else:
+                written = len(batch)
+
+            # Even a failed batch may have written part of its entries
+            for listener in self.listeners:
+                listener(usernames)
+            return written
+
+    def _requeue(self, items, usernames):
+        with self._lock:
+            for key, amount in items:
+                self._pending[key] = self._pending.get(key, 0) + amount
+            self._usernames |= usernames
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=self.flush_interval)
+        self.flush()
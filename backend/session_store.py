@@ -0,0 +1,31 @@
+import datetime
+import hashlib
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class SessionStore:
+    """One document per issued JWT, keyed by the token's SHA-256.
+
+    `expires_at` mirrors the JWT `exp` and carries a TTL index (see indexes.py),
+    so Mongo drops sessions on its own once the token could no longer be decoded anyway.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def create(self, token, username, expires_at):
+        self.collection.insert_one({
+            '_id': token_hash(token),
+            'username': username,
+            'expires_at': expires_at,
+            'created_at': datetime.datetime.utcnow()
+        })
+
+    def is_valid(self, token):
+        return self.collection.find_one({'_id': token_hash(token)}, {'_id': 1}) is not None
+
+    def revoke(self, token):
+        return self.collection.delete_one({'_id': token_hash(token)}).deleted_count > 0
@@ -0,0 +1,97 @@
+"""Trend analytics over a user's daily calories and progress.
+
+Each history is laid out as one dense float array with a slot per day of the
+window (oldest first, today last), so every metric is a handful of NumPy
+operations over contiguous memory.
+
+Run `python trends.py` to time a year of daily data.
+"""
+import math
+import numpy as np
+import dates
+
+WINDOW_DAYS = 365
+
+
+def daily_series(days, values, today, window=WINDOW_DAYS):
+    """Sum `values` into one slot per day of the window ending on `today`; days outside it are dropped."""
+    offsets = np.asarray(days, dtype=np.int64) - (today - window + 1)
+    values = np.asarray(values, dtype=np.float64)
+    inside = (offsets >= 0) & (offsets < window)
+    return np.bincount(offsets[inside], weights=values[inside], minlength=window)
+
+
+def rolling_average(series, days):
+    """Average of the last `days` slots, as of every day of the window."""
+    sums = np.cumsum(series)
+    sums[days:] = sums[days:] - sums[:-days]
+    return sums / days
+
+
+def streaks(series):
+    """(current, longest) run of days with activity; today still counts as open."""
+    edges = np.diff(np.concatenate(([0], (series > 0).astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    if not len(starts):
+        return 0, 0
+    lengths = ends - starts
+    current = int(lengths[-1]) if ends[-1] >= len(series) - 1 else 0
+    return current, int(lengths.max())
+
+
+def week_over_week(series):
+    this_week, last_week = float(series[-7:].sum()), float(series[-14:-7].sum())
+    return {
+        'this_week': this_week,
+        'last_week': last_week,
+        'delta': this_week - last_week,
+        'percent': round((this_week - last_week) / last_week * 100, 2) if last_week else None
+    }
+
+
+def projection(daily_rate, goal, total, end_day, today):
+    """When `total` reaches `goal` at the current daily rate; None if the goal is not numeric."""
+    try:
+        goal = float(goal)
+    except (TypeError, ValueError):
+        return None
+
+    result = {'goal': goal, 'total': total, 'end_date': dates.format_day(end_day), 'achieved': total >= goal}
+    if result['achieved']:
+        result.update(projected_completion_date=None, on_track=True)
+    elif daily_rate <= 0:
+        result.update(projected_completion_date=None, on_track=False)
+    else:
+        completion_day = today + math.ceil((goal - total) / daily_rate)
+        result.update(projected_completion_date=dates.format_day(completion_day), on_track=completion_day <= end_day)
+    return result
+
+
+def summarize(series, today, goal=None):
+    """Trend metrics for one daily series; `goal` is the goal document covering today, if any."""
+    average_7 = rolling_average(series, 7)[-1]
+    current_streak, longest_streak = streaks(series)
+    return {
+        'rolling_average_7': round(float(average_7), 2),
+        'rolling_average_30': round(float(rolling_average(series, 30)[-1]), 2),
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'week_over_week': week_over_week(series),
+        'projection': projection(float(average_7), goal['goal'], goal['total'], goal['end_date'], today) if goal else None
+    }
+
+
+if __name__ == '__main__':
+    import timeit
+
+    today = dates.today()
+    rng = np.random.default_rng(0)
+    days = np.arange(today - WINDOW_DAYS + 1, today + 1)
+    values = rng.integers(0, 600, size=len(days)) * (rng.random(len(days)) > 0.2)
+    goal = {'goal': 3000, 'total': 1200, 'end_date': today + 3}
+
+    def run():
+        summarize(daily_series(days, values, today), today, goal)
+
+    best = min(timeit.repeat(run, number=100, repeat=5)) / 100
+    print(f"{WINDOW_DAYS} days of data: {best * 1e3:.3f} ms per summary")
@@ -0,0 +1,74 @@
+"""Per-user memo of derived dashboard data, dropped whenever the user writes."""
+from flask import request, g
+from collections import OrderedDict
+import threading
+import time
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class UserCache:
+    """Bounded LRU of username -> computed value.
+
+    Entries expire after `ttl` seconds as a backstop; normally they are dropped by
+    `invalidate`. A value computed while an invalidation happened is not stored,
+    so a slow read cannot put pre-write data back into the cache.
+
+    Invalidations are numbered from one counter and only the latest `maxsize`
+    users' numbers are kept. A user without one reads the highest evicted
+    number instead, so evicting cannot make an interrupted computation look
+    current.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = OrderedDict()
+        self._last_generation = 0
+        self._evicted_generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, username, compute):
+        with self._lock:
+            generation = self._generations.get(username, self._evicted_generation)
+            entry = self._entries.get(username)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(username)
+                    return value
+                del self._entries[username]
+
+        value = compute()
+
+        with self._lock:
+            if self._generations.get(username, self._evicted_generation) == generation:
+                self._entries[username] = (value, time.time() + self.ttl)
+                self._entries.move_to_end(username)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, username):
+        with self._lock:
+            self._entries.pop(username, None)
+            self._last_generation += 1
+            self._generations[username] = self._last_generation
+            self._generations.move_to_end(username)
+            while len(self._generations) > self.maxsize:
+                _, evicted = self._generations.popitem(last=False)
+                self._evicted_generation = max(self._evicted_generation, evicted)
+
+    def invalidate_many(self, usernames):
+        for username in usernames:
+            self.invalidate(username)
+
+
+def invalidate_on_writes(app, cache, prefixes):
+    """Drop the caller's entry after every successful write under `prefixes`."""
+    @app.after_request
+    def invalidate_user_cache(response):
+        if request.method in WRITE_METHODS and request.path.startswith(prefixes) and response.status_code < 400 and hasattr(g, 'user'):
+            cache.invalidate(g.user['username'])
+        return response
@@ -1,36 +1,27 @@
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, Response, request, jsonify, g
 from flask_pymongo import PyMongo
 from flasgger import Swagger, swag_from
 from flask_cors import CORS
 from bson.objectid import ObjectId
 from config import Config
-import jwt
+from body_parts import init_body_parts
+from exercise_catalog import ExerciseCatalog
+from exercise_search import ExerciseSearch
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
 
 workouts_bp = Blueprint('workouts', __name__)
 
 def init_workouts_routes(app, mongo):
-    body_parts_collection = mongo.db.bodyParts
     exercises_collection = mongo.db.exercises
-    sessions_collection = mongo.db.sessions
+    body_parts = init_body_parts(app, mongo)
+    catalog = ExerciseCatalog(body_parts, exercises_collection, app.json.dumps, app.config['CATALOG_CACHE_TTL'])
+    app.extensions['exercise_catalog'] = catalog
+    search = ExerciseSearch(exercises_collection, app.config['SEARCH_INDEX_TTL'])
+    search.rebuild()
+    app.extensions['exercise_search'] = search
 
-    @app.before_request
-    def authenticate():
-        if request.path.startswith('/workouts'):  
-            token = request.headers.get('Authorization')
-            if not token or not token.startswith('Bearer '):  
-                return jsonify({"error": "Bearer token is missing"}), 401
-            token = token.split('Bearer ')[1]  
-            try:
-                payload = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-                g.user = payload  
-                session = sessions_collection.find_one({'username': payload['username'], 'tokens': token})
-                if not session:
-                    return jsonify({"error": "Invalid token"}), 401
-            except jwt.ExpiredSignatureError:
-                return jsonify({"error": "Token has expired"}), 401
-            except jwt.InvalidTokenError:
-                return jsonify({"error": "Invalid token"}), 401
-            
     @workouts_bp.route('/exercises/<string:body_part>', methods=['GET'])
     @swag_from({
     "tags": ["Exercises"],
@@ -40,13 +31,16 @@ def init_workouts_routes(app, mongo):
             "in": "path",
             "type": "string",
             "required": True,
-            "description": "The name of the body part."
+            "description": "The name of the body part, in any case."
         }
     ],
     "responses": {
         "200": {
             "description": "A list of exercises for the specified body part."
         },
+        "304": {
+            "description": "Not modified since the ETag sent in If-None-Match."
+        },
         "401": {
             "description": "Unauthorized access if token is missing or invalid."
         },
@@ -64,17 +58,48 @@ def init_workouts_routes(app, mongo):
         if not hasattr(g, 'user'):
             return jsonify({"error": "Unauthorized access"}), 401
 
-        body_part_document = body_parts_collection.find_one({'name': body_part})
-        if not body_part_document:
+        cached = catalog.get(body_part)
+        if not cached:
             return jsonify({"error": "Body part not found"}), 404
 
-        body_part_id = body_part_document['_id']
-        exercises = list(exercises_collection.find({'bodyPart_ref': str(body_part_id)}))
-        for exercise in exercises:
-            exercise['_id'] = str(exercise['_id'])
-            exercise['bodyPart_ref'] = str(exercise['bodyPart_ref'])   
+        body, etag = cached
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response
+
+    @workouts_bp.route('/search', methods=['GET'])
+    @swag_from({
+        'tags': ['Exercises'],
+        'summary': 'Search exercises',
+        'description': 'Rank exercises by the words of `q` found in their name or description. '
+                       'The last word also matches as a prefix, and words of 4+ letters tolerate a typo or two.',
+        'parameters': [
+            {'name': 'q', 'in': 'query', 'type': 'string', 'required': True},
+            {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False, 'description': f'Maximum results (1-{MAX_SEARCH_LIMIT}, default {DEFAULT_SEARCH_LIMIT})'}
+        ],
+        'responses': {
+            200: {'description': 'Matching exercises, best first.'},
+            400: {'description': 'Query is required or Invalid limit'},
+            401: {'description': 'Bearer token is missing or Token has expired or Invalid token'}
+        },
+        'security': [{'Bearer': []}]
+    })
+    def search_exercises():
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Query is required"}), 400
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            return jsonify({"error": "Limit must be a number"}), 400
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            return jsonify({"error": f"Limit must be between 1 and {MAX_SEARCH_LIMIT}"}), 400
 
-        return jsonify(exercises), 200
+        return jsonify(search.search(query, limit)), 200
 
     app.register_blueprint(workouts_bp, url_prefix='/workouts')
 